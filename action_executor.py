@@ -11,20 +11,66 @@ import subprocess
 import webbrowser
 import os
 import datetime
-import pyttsx3
+import itertools
+
+from native_threads import threading as native_threading
+from native_threads import time as native_time
+from native_threads import queue as native_queue
+from text_to_speech import SpeechService
+
+# Dispatch priorities (lower runs first). Cursor moves must track the hand,
+# so they overtake queued clicks/keys, which overtake slow actions.
+PRIORITY_CURSOR = 0
+PRIORITY_INPUT = 1
+PRIORITY_SLOW = 2
+
+# Actions that start programs or touch the system; they can take seconds.
+# Spoken feedback is not slow: it is handed to the speech service's own thread.
+SLOW_ACTIONS = {
+    'open_browser', 'close_browser', 'open_file_explorer', 'open_notepad', 'open_settings', 'open_mail',
+    'screenshot', 'shutdown', 'restart'
+}
+
+# Fixed announcements, rendered once at startup and played back from the cache
+STATIC_PHRASES = [
+    "Screenshot taken",
+    "Screen reading feature not fully implemented yet.",
+    "Voice typing enabled. Speak now.",
+    "Voice typing stopped."
+]
 
 
 class ActionExecutor:
-    def __init__(self):
-        """Initialize action executor"""
+    def __init__(self, queue_size=32):
+        """
+        Initialize action executor.
+        Actions submitted with submit() run one at a time on a dedicated
+        worker thread, so the recognition loops never wait for them.
+        """
         pyautogui.PAUSE = 0.05
         pyautogui.FAILSAFE = True
         self.os_type = platform.system()
 
-        # Text-to-Speech for accessibility
-        self.engine = pyttsx3.init()
+        # Text-to-Speech for accessibility (never blocks the caller)
+        self.speech = SpeechService(prerender=STATIC_PHRASES)
         self.voice_typing = False  # Tracks dictation mode
 
+        # --- Dispatch queue ---
+        self._queue = native_queue.PriorityQueue(maxsize=queue_size)
+        self._seq = itertools.count()  # FIFO order within a priority
+        self._cursor_lock = native_threading.Lock()
+        self._cursor_target = None     # Latest requested cursor position
+        self._cursor_pending = False   # A move is already queued (it will use the latest target)
+        # Finished actions for the app to report (drained from the hub via next_completion)
+        self.completions = native_queue.Queue(maxsize=256)
+        self.stats = {'submitted': 0, 'executed': 0, 'failed': 0, 'dropped': 0, 'cursor_moves': 0,
+                      'coalesced_moves': 0}
+        self.latency_ms = {}  # Priority -> {'last', 'avg', 'max', 'count'} from submit to done
+
+        self.running = True
+        self._worker = native_threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
         # --- Action map (gesture + voice) ---
         self.action_map = {
             # Mouse Actions
@@ -106,8 +152,8 @@ class ActionExecutor:
     # ============================================================
     # ----------------------- Core Executor ----------------------
     # ============================================================
-    def execute(self, action_name, params=None):
-        """Execute an action by name"""
+    def execute(self, action_name, params=None, quiet=False):
+        """Execute an action by name (blocking; the worker thread calls this)"""
         if not action_name:
             return False
 
@@ -126,7 +172,8 @@ class ActionExecutor:
                 else:
                     action_func()
 
-                print(f"✅ Executed action: {action_name}")
+                if not quiet:
+                    print(f"✅ Executed action: {action_name}")
                 return True
             except Exception as e:
                 print(f"❌ Error executing action '{action_name}': {e}")
@@ -135,6 +182,114 @@ class ActionExecutor:
             print(f"⚠️ Unknown action: {action_name}")
             return False
 
+    # ============================================================
+    # ---------------------- Dispatch Queue ----------------------
+    # ============================================================
+    def submit(self, action_name, params=None, info=None):
+        """
+        Queues an action for the worker thread and returns immediately.
+        `info` is passed back untouched with the completion report.
+        Returns False if the action is unknown or the queue is full.
+        """
+        if not action_name:
+            return False
+        action_name = action_name.lower().replace(' ', '_')
+        if action_name not in self.action_map:
+            print(f"⚠️ Unknown action: {action_name}")
+            return False
+
+        if action_name == 'move_cursor':
+            # Only the newest position matters: queued moves are merged into one
+            with self._cursor_lock:
+                self._cursor_target = params or {}
+                self.stats['cursor_moves'] += 1
+                if self._cursor_pending:
+                    self.stats['coalesced_moves'] += 1
+                    return True
+                self._cursor_pending = True
+            priority, params = PRIORITY_CURSOR, None
+        elif action_name in SLOW_ACTIONS:
+            priority = PRIORITY_SLOW
+        else:
+            priority = PRIORITY_INPUT
+
+        try:
+            self._queue.put_nowait((priority, next(self._seq), action_name, params, info, native_time.monotonic()))
+        except native_queue.Full:
+            if action_name == 'move_cursor':
+                with self._cursor_lock:
+                    self._cursor_pending = False
+            self.stats['dropped'] += 1
+            print(f"⚠️ Action queue full, dropped: {action_name}")
+            return False
+        self.stats['submitted'] += 1
+        return True
+
+    def _run(self):
+        """Worker thread: runs queued actions in priority order"""
+        while self.running:
+            try:
+                priority, _, action_name, params, info, submitted_at = self._queue.get(timeout=0.5)
+            except native_queue.Empty:
+                continue
+            if action_name is None:  # Stop marker
+                break
+            if action_name == 'move_cursor':
+                with self._cursor_lock:
+                    params = self._cursor_target
+                    self._cursor_pending = False
+
+            started_at = native_time.monotonic()
+            success = self.execute(action_name, params, quiet=(priority == PRIORITY_CURSOR))
+            done_at = native_time.monotonic()
+            self.stats['executed' if success else 'failed'] += 1
+            latency_ms = self._record_latency(priority, (done_at - submitted_at) * 1000)
+
+            if priority == PRIORITY_CURSOR:
+                continue  # Too frequent to report one by one; see get_stats()
+            try:
+                self.completions.put_nowait({
+                    'action': action_name,
+                    'success': success,
+                    'queued_ms': round((started_at - submitted_at) * 1000, 1),
+                    'run_ms': round((done_at - started_at) * 1000, 1),
+                    'latency_ms': round(latency_ms, 1),
+                    'info': info or {}
+                })
+            except native_queue.Full:
+                pass  # Nobody is draining the reports
+
+    def _record_latency(self, priority, latency_ms):
+        entry = self.latency_ms.setdefault(priority, {'last': None, 'avg': 0.0, 'max': 0.0, 'count': 0})
+        entry['count'] += 1
+        entry['last'] = round(latency_ms, 1)
+        entry['avg'] = round(entry['avg'] + (latency_ms - entry['avg']) / entry['count'], 1)
+        entry['max'] = round(max(entry['max'], latency_ms), 1)
+        return latency_ms
+
+    def next_completion(self, timeout=0.25):
+        """Blocks up to `timeout` for the next finished action (use run_native from the hub)"""
+        try:
+            return self.completions.get(timeout=timeout)
+        except native_queue.Empty:
+            return None
+
+    def get_stats(self):
+        names = {PRIORITY_CURSOR: 'cursor', PRIORITY_INPUT: 'input', PRIORITY_SLOW: 'slow'}
+        stats = dict(self.stats)
+        stats['queued'] = self._queue.qsize()
+        stats['latency_ms'] = {names[priority]: dict(entry) for priority, entry in self.latency_ms.items()}
+        return stats
+
+    def stop(self):
+        """Stops the worker after the action it is running"""
+        self.running = False
+        self.speech.close()
+        try:
+            self._queue.put_nowait((-1, -1, None, None, None, 0))
+        except native_queue.Full:
+            pass  # The worker notices `running` within its get() timeout
+
     # ============================================================
     # ------------------------- Mouse ----------------------------
     # ============================================================
@@ -148,7 +303,7 @@ class ActionExecutor:
     def move_cursor(self, x=None, y=None):
         """Move cursor — controlled externally via gesture coordinates"""
         if x is not None and y is not None:
-            pyautogui.moveTo(x, y)
+            pyautogui.moveTo(x, y, _pause=False)  # Moves stream continuously; no settle delay
 
     # ============================================================
     # ----------------------- Keyboard ---------------------------
@@ -222,8 +377,7 @@ class ActionExecutor:
     def take_screenshot(self):
         filename = f"screenshot_{time.strftime('%Y%m%d-%H%M%S')}.png"
         pyautogui.screenshot(filename)
-        self.engine.say("Screenshot taken")
-        self.engine.runAndWait()
+        self.speech.say("Screenshot taken", cache=True)
         print(f"📸 Saved {filename}")
 
     def lock_screen(self):
@@ -264,18 +418,15 @@ class ActionExecutor:
 
     def read_screen(self):
         """Placeholder for text-to-speech screen reading"""
-        self.engine.say("Screen reading feature not fully implemented yet.")
-        self.engine.runAndWait()
+        self.speech.say("Screen reading feature not fully implemented yet.", cache=True)
 
     def tell_time(self):
         now = datetime.datetime.now().strftime("%I:%M %p")
-        self.engine.say(f"The time is {now}")
-        self.engine.runAndWait()
+        self.speech.say(f"The time is {now}")
 
     def tell_date(self):
         today = datetime.date.today().strftime("%B %d, %Y")
-        self.engine.say(f"Today is {today}")
-        self.engine.runAndWait()
+        self.speech.say(f"Today is {today}")
 
     # ============================================================
     # ------------------- Dictation Mode -------------------------
@@ -283,15 +434,14 @@ class ActionExecutor:
     def start_voice_typing(self):
         """Activate voice typing mode"""
         self.voice_typing = True
-        self.engine.say("Voice typing enabled. Speak now.")
-        self.engine.runAndWait()
+        # A mode change makes older announcements moot: cut them off
+        self.speech.say("Voice typing enabled. Speak now.", cache=True, interrupt=True)
         print("🎙️ Voice typing started")
 
     def stop_voice_typing(self):
         """Stop voice typing mode"""
         self.voice_typing = False
-        self.engine.say("Voice typing stopped.")
-        self.engine.runAndWait()
+        self.speech.say("Voice typing stopped.", cache=True, interrupt=True)
         print("🛑 Voice typing stopped")
 
     # ============================================================
@@ -7,16 +7,21 @@ from flask import Flask, render_template, jsonify, request, send_from_directory
 from flask_socketio import SocketIO, emit
 from flask_cors import CORS
 import cv2
-import base64
-import json
-import threading
 import time
 import eventlet
 eventlet.monkey_patch() 
 
 import pyautogui
-from gesture_recognition import GestureRecognizer 
-from voice_recognition import VoiceRecognizer
+from gesture_recognition import GesturePipeline, preload_gesture_model
+from native_threads import run_native
+from native_threads import threading as native_threading
+from model_registry import models
+from config_store import ConfigStore, thaw
+from template_store import TemplateStore
+from video_preview import PreviewEncoder, PreviewBroadcaster
+from frame_ring import FrameRingWriter
+from voice_recognition import VoiceRecognizer, load_vosk_model
+from voice_commands import VoiceCommandMatcher, VoiceCommandGate
 from action_executor import ActionExecutor
 
 # Initialize Flask app
@@ -27,7 +32,13 @@ socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet')
 
 # Initialize modules
 action_executor = ActionExecutor()
-gesture_recognizer = None
+preview_encoder = PreviewEncoder()
+preview_broadcaster = PreviewBroadcaster(
+    lambda sid, payload, callback: socketio.emit('video_frame', payload, to=sid, callback=callback)
+)
+gesture_recognizer = None # Primary source's recognizer (learning / template edits)
+gesture_pipeline = None
+frame_ring = None # Optional shared-memory ring with the annotated frames for local readers
 voice_recognizer = None
 
 SCREEN_WIDTH, SCREEN_HEIGHT = pyautogui.size()
@@ -48,49 +59,46 @@ app_state = {
 }
 
 # --- MODIFIED: State for Learning Gestures ---
-config_lock = threading.Lock()
 learning_mode = False
 new_gesture_name = None
 learning_status = {"status": "idle", "message": ""}
 learning_samples = []
+voice_latency = {'last_ms': None, 'avg_ms': None, 'max_ms': None, 'count': 0} # Utterance end -> action done
 TARGET_SAMPLES = 30 # Set to 30 for speed, you can change this to 50
 # --- END MODIFIED ---
 
 
-# --- Configuration Management (Unchanged) ---
-def load_config():
-    try:
-        with open('config.json', 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        print("config.json not found, creating a default one.")
-        default_config = get_default_config()
-        save_config(default_config)
-        return default_config
-    except json.JSONDecodeError:
-        print("Error reading config.json, it might be corrupted. Using default.")
-        return get_default_config()
-
-def save_config(new_config):
-    global config
-    try:
-        with open('config.json', 'w') as f:
-            json.dump(new_config, f, indent=2)
-        config = new_config 
-        return True
-    except Exception as e:
-        print(f"Error saving config: {e}")
-        return False
-
+# --- Configuration Management ---
+# config.json lives in memory (config_store); reads take a snapshot, changes go
+# through config_store.update() and reach the disk in the background.
 def get_default_config():
     return {
-        "settings": { "camera_index": 0, "camera_width": 640, "camera_height": 480, "gesture_cooldown": 0.5, "voice_cooldown": 0.5, "voice_sample_rate": 16000 },
+        "settings": { "camera_index": 0, "camera_width": 640, "camera_height": 480, "gesture_cooldown": 0.5, "voice_cooldown": 0.5, "cursor_smoothing": 0.7, "custom_gesture_threshold": 0.08, "voice_sample_rate": 16000, "voice_block_size": 800, "voice_mode": "command", "voice_early_commit": True, "voice_fuzzy_matching": False, "voice_fuzzy_cutoff": 0.8, "voice_vad_enabled": True, "voice_vad_threshold": 300, "voice_vad_padding": 0.3, "voice_vad_hangover": 0.4, "preload_models": True, "gesture_engine": "video", "custom_gesture_index": "linear", "keyframe_interval": 1, "keyframe_motion_threshold": 3.0, "num_hands": 1, "camera_indices": [], "preview_source": 0, "preview_quality": 70, "preview_max_width": 480, "preview_fps": 15, "frame_ring_enabled": False, "frame_ring_name": "gesture_frames", "frame_ring_slots": 4 },
         "gestures": { "Thumb_Up": { "name": "Thumbs Up", "action": "click" } },
-        "voice_commands": { "click": { "command": "click", "action": "click" } },
-        "custom_gesture_data": {}
+        "voice_commands": { "click": { "command": "click", "action": "click" } }
     }
 
-config = load_config()
+def rebuild_voice_matcher(current_config):
+    """Compiles the voice command matcher; call whenever voice_commands or its settings change"""
+    global voice_matcher
+    settings = current_config.get('settings', {})
+    voice_matcher = VoiceCommandMatcher(
+        current_config.get('voice_commands', {}),
+        fuzzy=settings.get('voice_fuzzy_matching', False),
+        fuzzy_cutoff=settings.get('voice_fuzzy_cutoff', 0.8)
+    )
+
+config_store = ConfigStore('config.json', default_factory=get_default_config)
+rebuild_voice_matcher(config_store.snapshot())
+
+# Learned gesture templates are binary (custom_gestures.f32 + .json), not part
+# of config.json; older configs carry them as custom_gesture_data
+template_store = TemplateStore('custom_gestures')
+if 'custom_gesture_data' in config_store.snapshot():
+    legacy = config_store.snapshot()['custom_gesture_data']
+    if legacy:
+        print(f"Moved {template_store.import_templates(legacy)} custom gestures out of config.json")
+    config_store.update(lambda cfg: cfg.pop('custom_gesture_data', None))
 
 # --- HTTP Routes ---
 @app.route('/')
@@ -103,29 +111,62 @@ def send_static(path):
 
 @app.route('/api/config', methods=['GET'])
 def get_config_api():
-    return jsonify(config)
+    return jsonify(thaw(config_store.snapshot()))
+
+# Settings that need the cameras/models/microphone reopened; all other settings
+# are applied to the running pipelines on the fly
+GESTURE_RESTART_SETTINGS = {
+    'camera_index', 'camera_indices', 'camera_width', 'camera_height', 'num_hands',
+    'gesture_engine', 'custom_gesture_index',
+    'frame_ring_enabled', 'frame_ring_name', 'frame_ring_slots'
+}
+VOICE_RESTART_SETTINGS = {'voice_sample_rate', 'voice_block_size'}
 
 @app.route('/api/config/settings', methods=['POST'])
 def update_settings():
-    global config
     try:
         new_settings = request.json.get('settings')
         if new_settings:
-            with config_lock:
-                config['settings'].update(new_settings)
-                save_config(config)
+            old_settings = config_store.snapshot()['settings']
+            changed = {key for key, value in new_settings.items() if thaw(old_settings.get(key)) != value}
+            config_store.update(lambda cfg: cfg['settings'].update(new_settings))
+            rebuild_voice_matcher(config_store.snapshot())
             
-            if app_state['gesture_enabled']:
-                handle_stop_gesture()
+            # Everything else is picked up live by the running loops
+            restarted, failed = [], []
+            if app_state['gesture_enabled'] and changed & GESTURE_RESTART_SETTINGS:
+                stop_gesture_recognition()
                 socketio.sleep(0.5) 
-                handle_start_gesture()
+                (restarted if start_gesture_recognition() else failed).append('gesture')
+            if app_state['voice_enabled'] and changed & VOICE_RESTART_SETTINGS:
+                stop_voice_recognition()
+                socketio.sleep(0.5)
+                (restarted if start_voice_recognition() else failed).append('voice')
             
-            return jsonify({'success': True})
+            return jsonify({'success': True, 'restarted': restarted, 'failed': failed})
         else:
             return jsonify({'success': False, 'error': 'No settings found in request'}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    stats = {'statistics': app_state['statistics']}
+    if gesture_pipeline:
+        stats['gesture_sources'] = gesture_pipeline.get_stats()
+    stats['preview'] = preview_encoder.get_stats()
+    stats['preview_clients'] = preview_broadcaster.get_stats()
+    if frame_ring:
+        stats['frame_ring'] = frame_ring.get_stats()
+    if voice_recognizer:
+        stats['voice'] = voice_recognizer.get_stats()
+    stats['voice_latency'] = voice_latency
+    stats['actions'] = action_executor.get_stats()
+    stats['speech'] = action_executor.speech.get_stats()
+    stats['models'] = models.get_stats()
+    stats['config'] = config_store.get_stats()
+    return jsonify(stats)
+
 @app.route('/api/actions', methods=['GET'])
 def get_actions():
     action_list = list(action_executor.action_map.keys())
@@ -133,44 +174,41 @@ def get_actions():
 
 @app.route('/api/gestures', methods=['POST'])
 def update_gestures():
-    global config
     try:
         new_gestures = request.json
-        with config_lock:
+        def apply(cfg):
             for gesture_name, action_name in new_gestures.items():
-                if gesture_name in config['gestures']:
-                    config['gestures'][gesture_name]['action'] = action_name if action_name != "null" else None
+                if gesture_name in cfg['gestures']:
+                    cfg['gestures'][gesture_name]['action'] = action_name if action_name != "null" else None
                 else:
-                    config['gestures'][gesture_name] = {"name": gesture_name, "action": action_name if action_name != "null" else None}
-            
-            if save_config(config):
-                return jsonify({'success': True})
-            else:
-                return jsonify({'success': False, 'error': 'Failed to save config'}), 500
+                    cfg['gestures'][gesture_name] = {"name": gesture_name, "action": action_name if action_name != "null" else None}
+        
+        config_store.update(apply)
+        return jsonify({'success': True})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/voice', methods=['POST'])
 def update_voice_commands():
-    global config
     try:
         new_commands = request.json
-        with config_lock:
+        def apply(cfg):
             for command_key, action_name in new_commands.items():
-                if command_key in config['voice_commands']:
-                    config['voice_commands'][command_key]['action'] = action_name if action_name != "null" else None
-            
-            if save_config(config):
-                return jsonify({'success': True})
-            else:
-                return jsonify({'success': False, 'error': 'Failed to save config'}), 500
+                if command_key in cfg['voice_commands']:
+                    cfg['voice_commands'][command_key]['action'] = action_name if action_name != "null" else None
+        
+        config_store.update(apply)
+        rebuild_voice_matcher(config_store.snapshot())
+        if voice_recognizer:
+            voice_recognizer.set_commands(voice_matcher.mapped_phrases) # Rebuild the command grammar
+        return jsonify({'success': True})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 # --- MODIFIED: Routes for Learning Gestures ---
 @app.route('/api/learn_gesture', methods=['POST'])
 def learn_gesture_route():
-    global learning_mode, new_gesture_name, learning_status, config, learning_samples
+    global learning_mode, new_gesture_name, learning_status, learning_samples
     
     data = request.json
     gesture_name = data.get('name')
@@ -178,9 +216,9 @@ def learn_gesture_route():
     if not gesture_name:
         return jsonify({"status": "error", "message": "Gesture name is required."}), 400
     
-    with config_lock:
-        if gesture_name in config['gestures'] or gesture_name in config['custom_gesture_data']:
-            return jsonify({"status": "error", "message": "This name is already used. Please choose another."}), 400
+    config = config_store.snapshot()
+    if gesture_name in config['gestures'] or gesture_name in template_store:
+        return jsonify({"status": "error", "message": "This name is already used. Please choose another."}), 400
 
     learning_mode = True
     new_gesture_name = gesture_name
@@ -198,36 +236,50 @@ def get_learning_status():
 # --- NEW: Route for Deleting Gestures ---
 @app.route('/api/gesture/delete', methods=['POST'])
 def delete_gesture():
-    global config
     data = request.json
     gesture_name = data.get('name')
     
     if not gesture_name:
         return jsonify({'success': False, 'error': 'No gesture name provided.'}), 400
     
-    with config_lock:
-        config = load_config() # Load fresh config
-        
+    def apply(cfg):
         # Check if it's a built-in gesture (cannot be deleted)
-        if gesture_name in config['gestures'] and config['gestures'][gesture_name]['name'] != gesture_name:
-            return jsonify({'success': False, 'error': 'Cannot delete a built-in gesture.'}), 400
+        if gesture_name in cfg['gestures'] and cfg['gestures'][gesture_name]['name'] != gesture_name:
+            raise PermissionError('Cannot delete a built-in gesture.')
         
-        # Delete from both mappings and data
-        deleted_from_gestures = config['gestures'].pop(gesture_name, None)
-        deleted_from_data = config['custom_gesture_data'].pop(gesture_name, None)
+        # Delete from both mappings and template data
+        deleted_from_gestures = cfg['gestures'].pop(gesture_name, None)
         
-        if deleted_from_gestures is None and deleted_from_data is None:
-            return jsonify({'success': False, 'error': 'Gesture not found.'}), 404
+        if deleted_from_gestures is None and gesture_name not in template_store:
+            raise KeyError(gesture_name)
+    
+    try:
+        config_store.update(apply)
+    except PermissionError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except KeyError:
+        return jsonify({'success': False, 'error': 'Gesture not found.'}), 404
+    try:
+        # fsyncs and may compact the data file; keep it off the hub
+        run_native(template_store.remove, gesture_name)
+    except OSError as e:
+        # The mapping is already published and the template is gone from memory;
+        # the store's next index write drops it on disk
+        print(f"Error removing template '{gesture_name}': {e}")
 
-        if save_config(config):
-            print(f"Deleted custom gesture: {gesture_name}")
-            return jsonify({'success': True})
-        else:
-            return jsonify({'success': False, 'error': 'Failed to save config after deletion.'}), 500
+    if gesture_recognizer:
+        gesture_recognizer.remove_custom_gesture(gesture_name)
+    print(f"Deleted custom gesture: {gesture_name}")
+    return jsonify({'success': True})
 # --- END NEW ---
 
 
 # --- Socket.IO Events (handle_start_gesture is modified) ---
+def update_annotation():
+    """Frames are only annotated while a preview client or the frame ring consumes them"""
+    if gesture_pipeline:
+        gesture_pipeline.set_annotate(preview_broadcaster.has_subscribers() or frame_ring is not None)
+
 @socketio.on('connect')
 def handle_connect():
     print('Client connected')
@@ -239,103 +291,227 @@ def handle_connect():
 @socketio.on('disconnect')
 def handle_disconnect():
     print('Client disconnected')
-
-@socketio.on('start_gesture')
-def handle_start_gesture():
-    global gesture_recognizer, app_state
+    preview_broadcaster.unsubscribe(request.sid)
+    update_annotation()
+
+# The dashboard subscribes while its video preview is actually visible
+@socketio.on('preview_subscribe')
+def handle_preview_subscribe():
+    preview_broadcaster.subscribe(request.sid)
+    update_annotation()
+
+@socketio.on('preview_unsubscribe')
+def handle_preview_unsubscribe():
+    preview_broadcaster.unsubscribe(request.sid)
+    update_annotation()
+
+# Start/stop helpers shared by the Socket.IO handlers and update_settings.
+# They report with socketio.emit (to every client): flask_socketio's emit()
+# only works inside a Socket.IO event, not in an HTTP request.
+def start_gesture_recognition():
+    """Opens the cameras and starts gesture_loop. Returns False if that failed."""
+    global gesture_recognizer, gesture_pipeline, frame_ring, app_state
     try:
         if not app_state['gesture_enabled']:
-            with config_lock:
-                current_config = load_config() # Load fresh config for recognizer
-                camera_index = current_config['settings']['camera_index']
-                width = current_config['settings']['camera_width']
-                height = current_config['settings']['camera_height']
+            if config_store.refresh(): # Pick up hand edits to config.json
+                rebuild_voice_matcher(config_store.snapshot())
+            current_config = config_store.snapshot()
+            camera_index = current_config['settings']['camera_index']
+            # Extra cameras (e.g. for different seating positions) run as parallel sources
+            camera_indices = current_config['settings'].get('camera_indices') or [camera_index]
+            num_hands = current_config['settings'].get('num_hands', 1)
+            width = current_config['settings']['camera_width']
+            height = current_config['settings']['camera_height']
+            engine = current_config['settings'].get('gesture_engine', 'video')
+            index_kind = current_config['settings'].get('custom_gesture_index', 'linear')
+            ring_enabled = current_config['settings'].get('frame_ring_enabled', False)
+            ring_name = current_config['settings'].get('frame_ring_name', 'gesture_frames')
+            ring_slots = current_config['settings'].get('frame_ring_slots', 4)
             
-            gesture_recognizer = GestureRecognizer(
-                camera_index=camera_index, width=width, height=height, config=current_config
+            # Opening cameras and fetching models blocks; keep it off the hub
+            gesture_pipeline = run_native(
+                GesturePipeline, camera_indices, width=width, height=height, config=current_config,
+                template_store=template_store, engine=engine, index_kind=index_kind, num_hands=num_hands
             )
+            if ring_enabled:
+                frame_ring = FrameRingWriter(ring_name, slots=ring_slots)
+            update_annotation()
+            gesture_pipeline.start()
+            gesture_recognizer = gesture_pipeline.primary
             app_state['gesture_enabled'] = True
             app_state['camera_active'] = True
             socketio.start_background_task(target=gesture_loop)
-            emit('gesture_status', {'message': 'Gesture recognition started'})
+            socketio.emit('gesture_status', {'message': 'Gesture recognition started'})
+        return True
     except Exception as e:
         print(f"Error starting gesture recognition: {e}")
-        emit('error', {'message': f'Failed to start gesture recognition: {str(e)}'})
+        socketio.emit('error', {'message': f'Failed to start gesture recognition: {str(e)}'})
+        return False
 
-@socketio.on('stop_gesture')
-def handle_stop_gesture():
-    global gesture_recognizer, app_state, learning_mode, learning_samples
+def stop_gesture_recognition():
+    global gesture_recognizer, gesture_pipeline, frame_ring, app_state, learning_mode, learning_samples
     app_state['gesture_enabled'] = False
     app_state['cursor_enabled'] = False
     learning_mode = False # Stop learning
     learning_samples = [] # Clear samples
-    if gesture_recognizer:
-        gesture_recognizer.stop()
+    if gesture_pipeline:
+        run_native(gesture_pipeline.stop) # Joins the worker threads without blocking the hub
+        gesture_pipeline = None
         gesture_recognizer = None
-    emit('gesture_status', {'message': 'Gesture recognition stopped'})
+    if frame_ring:
+        frame_ring.close()
+        frame_ring = None
+    socketio.emit('gesture_status', {'message': 'Gesture recognition stopped'})
 
-@socketio.on('start_voice')
-def handle_start_voice():
-    # (Unchanged)
+def start_voice_recognition():
+    """Opens the microphone and starts voice_loop. Returns False if that failed."""
     global voice_recognizer, app_state
     try:
         if not app_state['voice_enabled']:
-            with config_lock:
-                current_config = load_config()
-                model_path = 'static/models/vosk-model'
-                sample_rate = current_config['settings']['voice_sample_rate']
+            if config_store.refresh():
+                rebuild_voice_matcher(config_store.snapshot())
+            current_config = config_store.snapshot()
+            model_path = 'static/models/vosk-model'
+            sample_rate = current_config['settings']['voice_sample_rate']
+            phrases = voice_matcher.mapped_phrases
             
-            voice_recognizer = VoiceRecognizer(
-                model_path=model_path, sample_rate=sample_rate, config=current_config
+            # The model comes from the registry (loaded once); waiting for it must not block the hub
+            voice_recognizer = run_native(
+                VoiceRecognizer, model_path=model_path, sample_rate=sample_rate, config=current_config, commands=phrases
             )
             app_state['voice_enabled'] = True
             socketio.start_background_task(target=voice_loop)
-            emit('voice_status', {'message': 'Voice recognition started'})
+            socketio.emit('voice_status', {'message': 'Voice recognition started'})
+        return True
     except Exception as e:
         print(f"Error starting voice recognition: {e}")
-        emit('error', {'message': f'Failed to start voice recognition: {str(e)}'})
+        socketio.emit('error', {'message': f'Failed to start voice recognition: {str(e)}'})
+        return False
 
-@socketio.on('stop_voice')
-def handle_stop_voice():
-    # (Unchanged)
+def stop_voice_recognition():
     global voice_recognizer, app_state
     app_state['voice_enabled'] = False
     if voice_recognizer:
-        voice_recognizer.stop()
+        run_native(voice_recognizer.stop) # Joins the decoder thread without blocking the hub
         voice_recognizer = None
-    emit('voice_status', {'message': 'Voice recognition stopped'})
+    socketio.emit('voice_status', {'message': 'Voice recognition stopped'})
+
+@socketio.on('start_gesture')
+def handle_start_gesture():
+    start_gesture_recognition()
+
+@socketio.on('stop_gesture')
+def handle_stop_gesture():
+    stop_gesture_recognition()
+
+@socketio.on('start_voice')
+def handle_start_voice():
+    start_voice_recognition()
+
+@socketio.on('stop_voice')
+def handle_stop_voice():
+    stop_voice_recognition()
 
 
 # --- HEAVILY MODIFIED: Background Loops ---
 
+def dispatch_gesture(gesture_name, confidence, source_id=0, hand_id=None):
+    """Runs the action mapped to a recognized gesture and reports it to the UI"""
+    action = get_gesture_action(gesture_name) 
+    event = {'gesture': gesture_name, 'confidence': confidence, 'source_id': source_id, 'hand_id': hand_id}
+    
+    if action == 'toggle_cursor':
+        app_state['cursor_enabled'] = not app_state['cursor_enabled']
+        cursor_status = "ON" if app_state['cursor_enabled'] else "OFF"
+        print(f"Cursor Mode Toggled: {cursor_status}")
+        event['action'] = f'Cursor Mode {cursor_status}'
+        socketio.emit('gesture_recognized', event)
+        app_state['statistics']['gestures_recognized'] += 1
+    
+    elif action and not app_state['cursor_enabled']:
+        # Runs on the executor's worker; completion is reported by action_report_loop
+        action_executor.submit(action, info={'source': 'gesture', 'trigger': gesture_name})
+        event['action'] = action
+        socketio.emit('gesture_recognized', event)
+        app_state['statistics']['gestures_recognized'] += 1
+
+def get_two_hand_gesture(gesture_results):
+    """
+    Two hands in the same frame form a combined gesture named
+    "<left gesture>+<right gesture>". Returns that name if it is mapped.
+    """
+    if len(gesture_results) != 2:
+        return None
+    ordered = sorted(gesture_results, key=lambda g: g['handedness'] != 'Left')
+    combo_name = '+'.join(g['gesture'] for g in ordered)
+    if combo_name in config_store.snapshot().get('gestures', {}):
+        return combo_name
+    return None
+
 def gesture_loop():
     """
     Main loop for gesture recognition.
     MODIFIED to support sample-based learning.
+    Results arrive per camera source and carry one entry per detected hand.
     """
-    global gesture_recognizer, app_state, config
+    global gesture_recognizer, gesture_pipeline, app_state
     global learning_mode, new_gesture_name, learning_status, learning_samples
     
-    last_gesture_time = 0
-    with config_lock:
-        cooldown = config['settings']['gesture_cooldown']
+    # Gesture name -> time it last fired. Keyed by name, not by camera or hand
+    # position, so one gesture seen by several cameras fires one action.
+    last_gesture_times = {}
+    reported_failures = set() # Sources whose dead camera was already reported
+    settings_version = None
     prev_x, prev_y = 0, 0
-    smoothing = 0.7 
 
     while app_state['gesture_enabled']:
         try:
-            if gesture_recognizer is None: break
+            if gesture_pipeline is None: break
+            
+            # Pick up changed settings without restarting the cameras
+            if settings_version != config_store.version:
+                settings_version = config_store.version
+                settings = config_store.snapshot()['settings']
+                cooldown = settings['gesture_cooldown']
+                preview_source = settings.get('preview_source', 0)
+                # Preview, cursor and learning follow a single camera: each camera has
+                # its own coordinate frame and viewpoint. Unknown sources fall back to 0
+                control_source = preview_source if 0 <= preview_source < len(gesture_pipeline.recognizers) else 0
+                smoothing = settings.get('cursor_smoothing', 0.7)
+                preview_encoder.apply_settings(settings)
+                gesture_pipeline.apply_settings(settings)
             
-            frame, gesture_result, landmarks_result = gesture_recognizer.process_frame()
+            # A camera that failed or stopped delivering frames is reported once; with none left, stop
+            failed_sources = gesture_pipeline.failed_sources()
+            if len(failed_sources) != len(reported_failures):
+                if len(failed_sources) == len(gesture_pipeline.recognizers):
+                    print("No camera is delivering frames.")
+                    stop_gesture_recognition()
+                    socketio.emit('error', {'message': 'Gesture recognition stopped: no camera is delivering frames.'})
+                    break
+                for failed_source in set(failed_sources) - reported_failures:
+                    socketio.emit('error', {'message': f'Camera source {failed_source} is not delivering frames; '
+                                                       f'the other cameras keep running.'})
+                reported_failures.update(failed_sources)
             
-            if frame is None:
-                socketio.sleep(0.1)
+            # Inference runs on the workers' native threads; this never blocks the hub
+            result = gesture_pipeline.poll()
+            
+            if result is None:
+                # No fresh result yet: poll again shortly, back off if the cameras are gone
+                socketio.sleep(0.005 if gesture_pipeline.is_active() else 0.1)
                 continue
+            source_id, frame, gesture_results, hands = result
+            hand = hands[0] if hands else None
+            gesture_result = gesture_results[0] if gesture_results else None
             
             # --- LEARNING MODE LOGIC ---
-            if learning_mode:
+            if learning_mode and source_id != control_source:
+                pass # Samples only come from the control camera; other sources idle while learning
+            
+            elif learning_mode:
                 status_msg = ""
-                if landmarks_result:
+                if hand is not None:
                     # 1. Check for conflict with BUILT-IN gestures
                     if gesture_result and gesture_result['gesture'] != 'None':
                         status_msg = f"Conflict: Too similar to '{gesture_result['gesture']}'. Try a different pose."
@@ -345,8 +521,7 @@ def gesture_loop():
                     
                     # 2. No conflict, collect sample
                     else:
-                        normalized_landmarks = gesture_recognizer.normalize_landmarks(landmarks_result[0])
-                        learning_samples.append(normalized_landmarks)
+                        learning_samples.append(hand.normalized)
                         
                         sample_count = len(learning_samples)
                         status_msg = f"Hold still... ({sample_count}/{TARGET_SAMPLES})"
@@ -356,12 +531,14 @@ def gesture_loop():
                         # 3. Check if we are done collecting
                         if sample_count >= TARGET_SAMPLES:
                             print(f"Collected {sample_count} samples. Averaging and saving...")
-                            result = gesture_recognizer.save_averaged_template(learning_samples, new_gesture_name)
+                            # Appends to the template store with an fsync; keep it off the hub
+                            result = run_native(gesture_recognizer.save_averaged_template,
+                                                learning_samples, new_gesture_name)
                             
                             if result["status"] == "success":
-                                with config_lock:
-                                    config['gestures'][new_gesture_name] = {"name": new_gesture_name, "action": None}
-                                    save_config(config)
+                                learned_name = new_gesture_name
+                                config_store.update(lambda cfg: cfg['gestures'].__setitem__(
+                                    learned_name, {"name": learned_name, "action": None}))
                                 learning_status = {"status": "success", "message": result["message"]}
                                 print(f"Successfully learned: {new_gesture_name}")
                             
@@ -382,51 +559,48 @@ def gesture_loop():
 
             # --- NORMAL OPERATION LOGIC (NOW IN 'ELSE') ---
             else:
-                if app_state['cursor_enabled'] and landmarks_result:
+                if app_state['cursor_enabled'] and hand is not None and source_id == control_source:
                     try:
-                        index_finger_tip = landmarks_result[0][8] 
-                        x = int(index_finger_tip.x * SCREEN_WIDTH)
-                        y = int(index_finger_tip.y * SCREEN_HEIGHT)
+                        tip_x, tip_y = hand.points[8, :2] # Index finger tip
+                        x = int(tip_x * SCREEN_WIDTH)
+                        y = int(tip_y * SCREEN_HEIGHT)
                         smooth_x = int(prev_x + (x - prev_x) * (1 - smoothing))
                         smooth_y = int(prev_y + (y - prev_y) * (1 - smoothing))
-                        pyautogui.moveTo(smooth_x, smooth_y)
+                        action_executor.submit('move_cursor', {'x': smooth_x, 'y': smooth_y})
                         prev_x, prev_y = smooth_x, smooth_y
                     except Exception as e:
                         pass 
                 
-                if gesture_result and gesture_result['gesture']:
-                    current_time = time.time()
-                    gesture_name = gesture_result['gesture']
-                    
-                    if (current_time - last_gesture_time >= cooldown) and (gesture_name != 'None'):
-                        confidence = gesture_result['confidence']
-                        action = get_gesture_action(gesture_name) 
-                        
-                        if action == 'toggle_cursor':
-                            app_state['cursor_enabled'] = not app_state['cursor_enabled']
-                            cursor_status = "ON" if app_state['cursor_enabled'] else "OFF"
-                            print(f"Cursor Mode Toggled: {cursor_status}")
-                            socketio.emit('gesture_recognized', {
-                                'gesture': gesture_name, 'confidence': confidence, 'action': f'Cursor Mode {cursor_status}'
-                            })
-                            app_state['statistics']['gestures_recognized'] += 1
-                        
-                        elif action and not app_state['cursor_enabled']:
-                            success = action_executor.execute(action)
-                            if success:
-                                app_state['statistics']['actions_executed'] += 1
-                            socketio.emit('gesture_recognized', {
-                                'gesture': gesture_name, 'confidence': confidence, 'action': action
-                            })
-                            app_state['statistics']['gestures_recognized'] += 1
-                        
-                        last_gesture_time = current_time
+                recognized = [g for g in gesture_results if g and g['gesture'] and g['gesture'] != 'None']
+                current_time = time.time()
+
+                # A mapped two-hand combination replaces the individual gestures
+                combo_name = get_two_hand_gesture(recognized)
+                if combo_name:
+                    candidates = [(combo_name, min(g['confidence'] for g in recognized), None)]
+                else:
+                    candidates = [(g['gesture'], g['confidence'], g['hand_id']) for g in recognized]
+
+                for gesture_name, confidence, hand_id in candidates:
+                    if current_time - last_gesture_times.get(gesture_name, 0) >= cooldown:
+                        dispatch_gesture(gesture_name, confidence, source_id, hand_id)
+                        last_gesture_times[gesture_name] = current_time
 
             # --- ENDIF learning_mode ---
             
-            _, buffer = cv2.imencode('.jpg', frame)
-            jpg_as_text = base64.b64encode(buffer).decode('utf-8')
-            socketio.emit('video_frame', {'frame': jpg_as_text})
+            # Local processes read the annotated frames from shared memory;
+            # publishing is a single copy into the ring
+            if frame_ring:
+                frame_ring.publish(frame, source_id)
+            
+            # Preview is rate-capped separately from recognition and sent as a
+            # binary Socket.IO attachment (no base64). Nothing is encoded while
+            # nobody watches; encoding itself runs off the hub.
+            if (source_id == control_source and preview_broadcaster.has_subscribers()
+                    and preview_encoder.due()):
+                jpeg = run_native(preview_encoder.encode, frame)
+                if jpeg:
+                    preview_broadcaster.publish({'frame': jpeg, 'source_id': source_id})
             
             socketio.sleep(0.01)
             
@@ -437,78 +611,138 @@ def gesture_loop():
     print("Gesture loop stopped.")
 
 
+def record_voice_latency(utterance_end):
+    """Time from the end of the spoken command until its action has run"""
+    latency_ms = (time.monotonic() - utterance_end) * 1000
+    count = voice_latency['count'] + 1
+    avg = voice_latency['avg_ms'] or 0.0
+    voice_latency.update({
+        'last_ms': round(latency_ms, 1),
+        'avg_ms': round(avg + (latency_ms - avg) / count, 1),
+        'max_ms': round(max(voice_latency['max_ms'] or 0.0, latency_ms), 1),
+        'count': count
+    })
+    return latency_ms
+
+def run_voice_command(command_text, confidence, result, voice_mode, early=False):
+    """Executes the action for a recognized phrase and reports it to the UI"""
+    app_state['statistics']['commands_recognized'] += 1
+    action = get_voice_action_robust(command_text)
+    
+    if action:
+        # Runs on the executor's worker; voice latency is recorded when it completes
+        info = {'source': 'voice', 'trigger': command_text, 'utterance_end': result.get('utterance_end')}
+        action_executor.submit(action, info=info)
+        if action in ('start_voice_typing', 'stop_voice_typing'):
+            # Dictation needs free-form decoding; commands go back to the grammar
+            voice_recognizer.set_mode('free' if action == 'start_voice_typing' else voice_mode)
+    
+    event = {
+        'text': command_text,
+        'confidence': confidence,
+        'action': action or 'None',
+        'early': early
+    }
+    if not action and result.get('utterance_end'):
+        event['latency_ms'] = round(record_voice_latency(result['utterance_end']), 1)
+    socketio.emit('voice_recognized', event)
+
+def action_report_loop():
+    """
+    Reports finished actions to the UI. The executor's worker is a native
+    thread and must not emit itself; this green thread relays its reports.
+    """
+    while True:
+        try:
+            report = run_native(action_executor.next_completion, 0.5)
+            if report is None:
+                continue
+            if report['success']:
+                app_state['statistics']['actions_executed'] += 1
+            info = report.pop('info')
+            utterance_end = info.pop('utterance_end', None)
+            if utterance_end:
+                report['voice_latency_ms'] = round(record_voice_latency(utterance_end), 1)
+            report.update(info)
+            socketio.emit('action_completed', report)
+        except Exception as e:
+            print(f"Error in action report loop: {e}")
+            socketio.sleep(0.5)
+
 def voice_loop():
-    # (Unchanged)
+    """Waits for recognized speech and runs the matched commands"""
     global voice_recognizer, app_state
     
-    with config_lock:
-        cooldown = load_config()['settings']['voice_cooldown']
-        
-    last_command_time = 0
+    settings_version = config_store.version
+    settings = config_store.snapshot()['settings']
+    voice_mode = settings.get('voice_mode', 'command')
+    # Cooldown, early commit and dedup of early-committed utterances
+    gate = VoiceCommandGate(lambda text: voice_matcher.is_exact(text),
+                            cooldown=settings['voice_cooldown'],
+                            early_commit=settings.get('voice_early_commit', True))
     
     while app_state['voice_enabled']:
         try:
             if voice_recognizer is None: break
-            result = voice_recognizer.recognize()
-            
-            if result and result.get('text') and result.get('final', True):
-                current_time = time.time()
-                
-                if current_time - last_command_time >= cooldown:
-                    command_text = result['text']
-                    app_state['statistics']['commands_recognized'] += 1
-                    action = get_voice_action_robust(command_text)
-                    
-                    if action:
-                        success = action_executor.execute(action)
-                        if success:
-                            app_state['statistics']['actions_executed'] += 1
-                    
-                    socketio.emit('voice_recognized', {
-                        'text': command_text,
-                        'confidence': result.get('confidence', 1.0),
-                        'action': action or 'None'
-                    })
-                    last_command_time = current_time
+            # Pick up changed settings without reopening the microphone
+            if settings_version != config_store.version:
+                settings_version = config_store.version
+                settings = config_store.snapshot()['settings']
+                gate.cooldown = settings['voice_cooldown']
+                gate.early_commit = settings.get('voice_early_commit', True)
+                voice_mode = settings.get('voice_mode', 'command')
+                voice_recognizer.apply_settings(settings)
+                voice_recognizer.set_commands(voice_matcher.mapped_phrases)
+                if not action_executor.voice_typing:
+                    voice_recognizer.set_mode(voice_mode)
+            # Decoding runs on the recognizer's own thread; this green thread
+            # just waits (off the hub) until it produces a result
+            result = run_native(voice_recognizer.recognize, 0.25)
+            if not result or not gate.should_run(result, command_mode=(voice_recognizer.mode == 'command')):
+                continue
             
-            socketio.sleep(0.1)
+            run_voice_command(result['text'], result.get('confidence', 1.0), result, voice_mode,
+                              early=not result.get('final', True))
+            gate.ran(result)
         except Exception as e:
             print(f"Error in voice loop: {e}")
+            socketio.sleep(0.1)
 
     print("Voice loop stopped.")
 
 
 # --- Action Mapping (Unchanged) ---
 def get_gesture_action(gesture_name):
-    with config_lock:
-        if gesture_name in config.get('gestures', {}):
-            return config['gestures'][gesture_name].get('action')
+    gestures = config_store.snapshot().get('gestures', {})
+    if gesture_name in gestures:
+        return gestures[gesture_name].get('action')
     return None
 
 def get_voice_action_robust(spoken_text):
-    spoken_text = spoken_text.lower().strip()
-    if not spoken_text:
-        return None
+    """Action of the best matching voice command (compiled matcher, no config scan)"""
+    return voice_matcher.match(spoken_text)
 
-    spoken_words = set(spoken_text.split())
-    best_match_action = None
-    highest_match_count = 0
-
-    with config_lock:
-        commands = config.get('voice_commands', {}).values()
-    
-    for cmd_data in commands:
-        command_to_check = cmd_data.get('command', '').lower()
-        if not command_to_check:
-            continue
-        command_words = command_to_check.split()
-        if all(word in spoken_words for word in command_words):
-            if len(command_words) > highest_match_count:
-                highest_match_count = len(command_words)
-                best_match_action = cmd_data.get('action')
-    return best_match_action
+def preload_models(settings):
+    """
+    Loads (and warms up) the Vosk and MediaPipe models in the background so the
+    first start_voice / start_gesture is as fast as later ones.
+    """
+    try:
+        load_vosk_model('static/models/vosk-model')
+    except Exception as e:
+        print(f"Vosk model preload skipped: {e}")
+    try:
+        preload_gesture_model(settings.get('num_hands', 1), settings.get('gesture_engine', 'video'))
+    except Exception as e:
+        print(f"Gesture model preload skipped: {e}")
 
 if __name__ == '__main__':
+    settings = config_store.snapshot()['settings']
+    if settings.get('preload_models', True):
+        # A native thread: model loading is blocking C++ code the hub must not wait on
+        native_threading.Thread(target=preload_models, args=(settings,), daemon=True).start()
+    socketio.start_background_task(target=action_report_loop)
+    
     print("="*60)
     print("Gesture and Voice HCI System - Starting...")
     print("="*60)
@@ -0,0 +1,192 @@
+"""
+Configuration Store
+Keeps config.json in memory as the single source of truth for the app and the
+recognizers. Readers take snapshots (no disk I/O, no lock); writers go through
+`update()`, which publishes a new version. Snapshots are deep-frozen (dicts
+become read-only mappings, lists tuples), so nobody can change the live config
+behind the store's back. Changes are written to disk by a background thread,
+coalesced over `flush_delay` seconds, and atomically (temp file + rename), so
+a crash never leaves a half-written config.json. Pending changes are written
+on exit.
+"""
+
+import atexit
+import copy
+import json
+import os
+import tempfile
+from types import MappingProxyType
+
+from native_threads import threading as native_threading
+from native_threads import time as native_time
+
+
+def freeze(value):
+    """Read-only copy of a JSON value: dicts become MappingProxyType, lists tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    """Plain, mutable (and JSON-serializable) copy of a frozen value"""
+    if isinstance(value, MappingProxyType):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+
+class ConfigStore:
+    def __init__(self, path='config.json', default_factory=None, flush_delay=0.5):
+        """
+        default_factory: returns the config to use (and write) when the file
+        is missing or unreadable.
+        """
+        self.path = path
+        self.default_factory = default_factory or dict
+        self.flush_delay = flush_delay
+
+        self._lock = native_threading.Lock()
+        self._flush_needed = native_threading.Condition(self._lock)
+        self.version = 0
+        self.flushed_version = 0
+        self.writes = 0
+        self.last_flush_ms = None
+        self._mtime = None
+        self._data = self._read()          # Mutable master copy (private; replaced, never mutated)
+        self._snapshot = freeze(self._data)  # What readers get
+
+        self.running = True
+        self._flusher = native_threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def _read(self):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            self._mtime = os.path.getmtime(self.path)
+            return data
+        except FileNotFoundError:
+            print(f"{self.path} not found, creating a default one.")
+        except json.JSONDecodeError:
+            print(f"Error reading {self.path}, it might be corrupted. Using default.")
+        data = self.default_factory()
+        self.version += 1  # Persist the default
+        return data
+
+    # --- Reading ---
+    def snapshot(self):
+        """
+        The current config, deep-frozen. Snapshots never change after
+        publication, so they are safe to keep and read without locking.
+        Use update() for changes and thaw() for a plain copy (e.g. jsonify).
+        """
+        return self._snapshot
+
+    def refresh(self):
+        """Picks up edits made to the file by hand (only when nothing is waiting to be written)"""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return False
+        with self._lock:
+            if mtime == self._mtime or self.version != self.flushed_version:
+                return False
+            try:
+                with open(self.path, 'r') as f:
+                    data = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Ignoring unreadable {self.path}: {e}")
+                return False
+            self._mtime = mtime
+            self._data = data
+            self._snapshot = freeze(data)
+            self.version += 1
+            self.flushed_version = self.version
+            print(f"Reloaded {self.path} (edited outside the app)")
+            return True
+
+    # --- Writing ---
+    def update(self, mutator):
+        """
+        Applies `mutator(config)` to a copy of the current config and publishes
+        the copy as the next version. If the mutator raises, nothing changes
+        and the exception propagates. Returns the mutator's return value.
+        """
+        with self._lock:
+            data = copy.deepcopy(self._data)
+            result = mutator(data)
+            self._data = data
+            self._snapshot = freeze(data)
+            self.version += 1
+            self._flush_needed.notify()
+            return result
+
+    def _flush_loop(self):
+        with self._lock:
+            while self.running or self.version != self.flushed_version:
+                if self.version == self.flushed_version:
+                    self._flush_needed.wait(timeout=1.0)
+                    continue
+                # Debounce: let a burst of updates settle into one write
+                deadline = native_time.monotonic() + self.flush_delay
+                while self.running:
+                    remaining = deadline - native_time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._flush_needed.wait(timeout=remaining)
+                version, data = self.version, self._data
+                self._lock.release()
+                try:
+                    ok = self._write(data)
+                finally:
+                    self._lock.acquire()
+                if ok:
+                    self.flushed_version = max(self.flushed_version, version)
+                elif self.running:
+                    self._flush_needed.wait(timeout=1.0)  # Retry later
+                else:
+                    break
+
+    def _write(self, data):
+        start = native_time.perf_counter()
+        directory = os.path.dirname(os.path.abspath(self.path))
+        tmp_path = None
+        try:
+            with tempfile.NamedTemporaryFile('w', dir=directory, prefix='.config-', suffix='.tmp',
+                                             delete=False) as f:
+                tmp_path = f.name
+                json.dump(data, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._mtime = os.path.getmtime(self.path)
+        except Exception as e:
+            print(f"Error saving config: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+        self.writes += 1
+        self.last_flush_ms = round((native_time.perf_counter() - start) * 1000, 1)
+        return True
+
+    def get_stats(self):
+        return {
+            'version': self.version,
+            'flushed_version': self.flushed_version,
+            'writes': self.writes,
+            'last_flush_ms': self.last_flush_ms
+        }
+
+    def close(self):
+        """Writes any pending change (skipping the debounce) and stops the flusher thread; runs at exit"""
+        with self._lock:
+            if not self.running:
+                return
+            self.running = False
+            self._flush_needed.notify()
+        self._flusher.join(timeout=5.0)
@@ -0,0 +1,361 @@
+"""
+Shared-Memory Frame Ring
+Publishes the annotated camera frames to other local processes (recorders,
+accessibility overlays, ...) through a `multiprocessing.shared_memory` ring
+buffer. Frames are written once; any number of readers map the same memory
+and get NumPy views of it without copying or JPEG decoding.
+
+Layout (all fields uint64):
+  header      magic, version, slots, slot_bytes, max_height, max_width, channels, write_count
+  slot table  per slot: seq, height, width, source_id, timestamp_ns, reserved
+  slot data   `slots` blocks of `slot_bytes`, 64-byte aligned
+
+Each slot works like a seqlock: the writer sets its seq to an odd value while
+copying and to an even value when done. A reader checks the seq before and
+after using a frame to know whether it was overwritten in the meantime.
+
+Run `python frame_ring.py read` to watch the ring from another process and
+`python frame_ring.py benchmark` to measure throughput.
+"""
+
+import sys
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+DEFAULT_NAME = 'gesture_frames'
+MAGIC = 0x47455354_52494E47  # "GESTRING"
+VERSION = 1
+
+_HEADER_FIELDS = 8
+_SLOT_FIELDS = 6
+_ALIGN = 64
+
+# Rings created by a writer in this process (or inherited through fork)
+_WRITER_NAMES = set()
+
+# Header field positions
+_H_MAGIC, _H_VERSION, _H_SLOTS, _H_SLOT_BYTES, _H_HEIGHT, _H_WIDTH, _H_CHANNELS, _H_WRITE_COUNT = range(_HEADER_FIELDS)
+# Slot table field positions
+_S_SEQ, _S_HEIGHT, _S_WIDTH, _S_SOURCE, _S_TIMESTAMP = range(5)
+
+
+def _aligned(size):
+    return (size + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _layout(slots):
+    """Byte offsets of the slot table and the first slot's data"""
+    table_offset = _aligned(_HEADER_FIELDS * 8)
+    data_offset = _aligned(table_offset + slots * _SLOT_FIELDS * 8)
+    return table_offset, data_offset
+
+
+class FrameRingWriter:
+    """
+    Owns the shared-memory block. The block is sized from the first frame
+    published (slot capacity = that frame's shape); larger frames published
+    later are counted as dropped. Only one writer per ring name.
+    """
+
+    def __init__(self, name=DEFAULT_NAME, slots=4):
+        self.name = name
+        self.slots = max(2, int(slots))
+        self._shm = None
+        self._header = None
+        self._table = None
+        self._data = None
+        self.frames_published = 0
+        self.frames_dropped = 0
+
+    def _create(self, shape):
+        height, width = shape[:2]
+        channels = shape[2] if len(shape) > 2 else 1
+        slot_bytes = _aligned(height * width * channels)
+        table_offset, data_offset = _layout(self.slots)
+        size = data_offset + self.slots * slot_bytes
+
+        try:
+            self._shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        except FileExistsError:
+            # Left over from a crashed run; nobody else writes to our name
+            stale = shared_memory.SharedMemory(name=self.name)
+            stale.close()
+            stale.unlink()
+            self._shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+
+        _WRITER_NAMES.add(self.name)
+
+        buf = self._shm.buf
+        self._header = np.ndarray((_HEADER_FIELDS,), dtype=np.uint64, buffer=buf)
+        self._table = np.ndarray((self.slots, _SLOT_FIELDS), dtype=np.uint64, buffer=buf, offset=table_offset)
+        self._data = np.ndarray((self.slots, slot_bytes), dtype=np.uint8, buffer=buf, offset=data_offset)
+        self._table[:] = 0
+        self._header[:] = (0, VERSION, self.slots, slot_bytes, height, width, channels, 0)
+        self._header[_H_MAGIC] = MAGIC  # Written last: readers wait for it
+        print(f"Frame ring '{self.name}' created: {self.slots} slots of {width}x{height}x{channels}")
+
+    def publish(self, frame, source_id=0):
+        """Copies one uint8 frame into the next slot. Returns the frame's sequence number or None."""
+        if self._shm is None:
+            self._create(frame.shape)
+
+        height, width = frame.shape[:2]
+        channels = frame.shape[2] if frame.ndim > 2 else 1
+        if (frame.dtype != np.uint8 or height > self._header[_H_HEIGHT]
+                or width > self._header[_H_WIDTH] or channels != self._header[_H_CHANNELS]):
+            self.frames_dropped += 1
+            return None
+
+        count = int(self._header[_H_WRITE_COUNT])
+        slot = count % self.slots
+        entry = self._table[slot]
+        entry[_S_SEQ] = 2 * count + 1  # Odd: being written
+        nbytes = height * width * channels
+        self._data[slot, :nbytes].reshape(frame.shape)[...] = frame
+        entry[_S_HEIGHT] = height
+        entry[_S_WIDTH] = width
+        entry[_S_SOURCE] = source_id
+        entry[_S_TIMESTAMP] = time.monotonic_ns()
+        entry[_S_SEQ] = 2 * count + 2  # Even: complete
+        self._header[_H_WRITE_COUNT] = count + 1
+        self.frames_published += 1
+        return count + 1
+
+    def get_stats(self):
+        return {
+            'name': self.name,
+            'slots': self.slots,
+            'frames_published': self.frames_published,
+            'frames_dropped': self.frames_dropped
+        }
+
+    def close(self):
+        if self._shm is not None:
+            self._header = self._table = self._data = None
+            self._shm.close()
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+            _WRITER_NAMES.discard(self.name)
+            self._shm = None
+
+
+class RingFrame:
+    """A frame as seen by a reader: a read-only view into shared memory"""
+    __slots__ = ('seq', 'source_id', 'timestamp_ns', 'frame', '_entry', '_stamp')
+
+    def __init__(self, seq, source_id, timestamp_ns, frame, entry, stamp):
+        self.seq = seq
+        self.source_id = source_id
+        self.timestamp_ns = timestamp_ns
+        self.frame = frame
+        self._entry = entry
+        self._stamp = stamp
+
+    def valid(self):
+        """False once the writer has started overwriting this slot"""
+        return int(self._entry[_S_SEQ]) == self._stamp
+
+
+class FrameRingReader:
+    """
+    Attaches to an existing ring. Views returned by `latest()` / `next()` stay
+    valid only until the writer laps the ring; check `RingFrame.valid()` after
+    using one, or pass copy=True to get a private, already-verified copy.
+    """
+
+    def __init__(self, name=DEFAULT_NAME):
+        self.name = name
+        self._shm = shared_memory.SharedMemory(name=name)
+        self._untrack()
+
+        buf = self._shm.buf
+        self._header = np.ndarray((_HEADER_FIELDS,), dtype=np.uint64, buffer=buf)
+        if int(self._header[_H_MAGIC]) != MAGIC or int(self._header[_H_VERSION]) != VERSION:
+            self._shm.close()
+            raise ValueError(f"Shared memory '{name}' is not a version {VERSION} frame ring")
+        self.slots = int(self._header[_H_SLOTS])
+        slot_bytes = int(self._header[_H_SLOT_BYTES])
+        table_offset, data_offset = _layout(self.slots)
+        self._table = np.ndarray((self.slots, _SLOT_FIELDS), dtype=np.uint64, buffer=buf, offset=table_offset)
+        self._data = np.ndarray((self.slots, slot_bytes), dtype=np.uint8, buffer=buf, offset=data_offset)
+        self.channels = int(self._header[_H_CHANNELS])
+        self.last_seq = 0
+        self.frames_missed = 0
+
+    def _untrack(self):
+        # Before Python 3.13 attaching registers the block with this process's
+        # resource tracker, which would unlink it when the reader exits. The
+        # writer's own process tree shares its tracker, so leave that alone.
+        if self.name in _WRITER_NAMES:
+            return
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(self._shm._name, 'shared_memory')
+        except Exception:
+            pass
+
+    def write_count(self):
+        return int(self._header[_H_WRITE_COUNT])
+
+    def _read(self, seq, copy):
+        slot = (seq - 1) % self.slots
+        entry = self._table[slot]
+        stamp = 2 * seq
+        if int(entry[_S_SEQ]) != stamp:
+            return None  # Being written or already overwritten
+        height, width = int(entry[_S_HEIGHT]), int(entry[_S_WIDTH])
+        shape = (height, width, self.channels) if self.channels > 1 else (height, width)
+        frame = self._data[slot, :height * width * self.channels].reshape(shape)
+        source_id, timestamp_ns = int(entry[_S_SOURCE]), int(entry[_S_TIMESTAMP])
+        if copy:
+            frame = frame.copy()
+            if int(entry[_S_SEQ]) != stamp:
+                return None
+        else:
+            frame.flags.writeable = False
+        return RingFrame(seq, source_id, timestamp_ns, frame, entry, stamp)
+
+    def latest(self, copy=False):
+        """The newest complete frame, or None if there is none yet"""
+        count = self.write_count()
+        for seq in (count, count - 1):  # The newest slot may still be mid-write
+            if seq > 0:
+                ring_frame = self._read(seq, copy)
+                if ring_frame is not None:
+                    self.last_seq = seq
+                    return ring_frame
+        return None
+
+    def next(self, copy=False):
+        """
+        The oldest frame after the last one returned, for consumers that want
+        every frame (e.g. a recorder). Frames the writer already overwrote are
+        skipped and counted in `frames_missed`. Returns None when caught up.
+        """
+        count = self.write_count()
+        oldest = max(self.last_seq + 1, count - self.slots + 2)
+        if oldest > self.last_seq + 1:
+            self.frames_missed += oldest - self.last_seq - 1
+            self.last_seq = oldest - 1
+        while self.last_seq < count:
+            seq = self.last_seq + 1
+            ring_frame = self._read(seq, copy)
+            self.last_seq = seq
+            if ring_frame is not None:
+                return ring_frame
+            self.frames_missed += 1
+        return None
+
+    def close(self):
+        self._header = self._table = self._data = None
+        try:
+            self._shm.close()
+        except BufferError:
+            pass  # A caller still holds a frame view; the mapping goes away with it
+
+
+def read_client(name=DEFAULT_NAME, show=True):
+    """Small reader: shows the newest frame and prints the receive rate"""
+    import cv2
+
+    reader = None
+    while reader is None:
+        try:
+            reader = FrameRingReader(name)
+        except (FileNotFoundError, ValueError):
+            print(f"Waiting for frame ring '{name}'... (enable frame_ring_enabled and start gesture recognition)")
+            time.sleep(1.0)
+
+    frames, window_start = 0, time.monotonic()
+    try:
+        while True:
+            ring_frame = reader.next()
+            if ring_frame is None:
+                time.sleep(0.002)
+                continue
+            frames += 1
+            if show:
+                cv2.imshow(f"{name} (source {ring_frame.source_id})", ring_frame.frame)
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+            now = time.monotonic()
+            if now - window_start >= 1.0:
+                latency_ms = (time.monotonic_ns() - ring_frame.timestamp_ns) / 1e6
+                print(f"{frames / (now - window_start):6.1f} fps, latency {latency_ms:5.1f} ms, missed {reader.frames_missed}")
+                frames, window_start = 0, now
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
+        if show:
+            cv2.destroyAllWindows()
+
+
+def _benchmark_reader(name, seconds, results):
+    reader = FrameRingReader(name)
+    frames, checksum = 0, 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        ring_frame = reader.next()
+        if ring_frame is None:
+            continue
+        checksum += int(ring_frame.frame[0, 0, 0])  # Touch the view like a real consumer
+        frames += 1
+    results.put((frames, reader.frames_missed))
+    reader.close()
+
+
+def benchmark(shape=(480, 640, 3), readers=(1, 4), seconds=2.0, slots=8):
+    """Writer throughput and per-reader receive rate, compared with a JPEG round trip"""
+    import multiprocessing
+    import cv2
+
+    frame = np.random.default_rng(0).integers(0, 256, shape, dtype=np.uint8)
+    name = f"{DEFAULT_NAME}_bench"
+
+    start = time.perf_counter()
+    for _ in range(50):
+        ok, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
+        cv2.imdecode(jpeg, cv2.IMREAD_COLOR)
+    jpeg_ms = (time.perf_counter() - start) / 50 * 1000
+    print(f"JPEG encode+decode of {shape[1]}x{shape[0]}: {jpeg_ms:.2f} ms/frame")
+
+    for reader_count in readers:
+        writer = FrameRingWriter(name, slots=slots)
+        writer.publish(frame)
+        results = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=_benchmark_reader, args=(name, seconds, results))
+                 for _ in range(reader_count)]
+        for proc in procs:
+            proc.start()
+
+        published = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            writer.publish(frame)
+            published += 1
+        elapsed = time.perf_counter() - start
+
+        received = [results.get() for _ in procs]
+        for proc in procs:
+            proc.join()
+        writer.close()
+
+        per_reader = sum(r[0] for r in received) / len(received) / elapsed
+        missed = sum(r[1] for r in received) / len(received)
+        print(f"{reader_count} reader(s): publish {published / elapsed:8.0f} fps "
+              f"({elapsed / published * 1e6:.0f} us/frame), each reader {per_reader:8.0f} fps, "
+              f"missed {missed:.0f} per reader")
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'read'
+    ring_name = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_NAME
+    if command == 'benchmark':
+        benchmark()
+    else:
+        read_client(ring_name)
@@ -0,0 +1,270 @@
+"""
+Custom Gesture Template Index
+Nearest-template lookup for the 42-dimensional normalized landmark vectors
+used by custom gestures. Two interchangeable indexes are provided:
+  * LinearTemplateIndex - one batched distance pass over a float32 matrix
+  * KDTreeTemplateIndex - NumPy KD-tree with bucketed leaves for large libraries
+Both support incremental insert/delete and a radius-bounded nearest query.
+
+Run `python gesture_index.py` for a per-frame match latency benchmark.
+"""
+
+import math
+import time
+
+import numpy as np
+
+from native_threads import threading as native_threading
+
+TEMPLATE_DIM = 42
+
+
+def threshold_to_radius(mse_threshold, dim=TEMPLATE_DIM):
+    """The recognizers use MSE < threshold; that is a Euclidean ball of this radius"""
+    return math.sqrt(mse_threshold * dim)
+
+
+class LinearTemplateIndex:
+    """
+    Keeps every template in one contiguous float32 matrix and scans it with a
+    single vectorized distance computation. Deleted rows are tombstoned and
+    compacted away once they make up a quarter of the matrix.
+    """
+
+    def __init__(self, dim=TEMPLATE_DIM):
+        self.dim = dim
+        self._lock = native_threading.Lock()
+        self._data = np.empty((16, dim), dtype=np.float32)
+        self._alive = np.zeros(16, dtype=bool)
+        self._names = []     # Row -> name (None for deleted rows)
+        self._rows = {}      # Name -> row
+        self._count = 0      # Rows in use, including tombstones
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, name):
+        return name in self._rows
+
+    def names(self):
+        return list(self._rows)
+
+    def insert(self, name, vector):
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        if vector.shape != (self.dim,):
+            raise ValueError(f"Template '{name}' has shape {vector.shape}, expected ({self.dim},)")
+        with self._lock:
+            if name in self._rows:
+                self._delete_locked(name)
+            if self._count == len(self._data):
+                self._grow()
+            row = self._count
+            self._data[row] = vector
+            self._alive[row] = True
+            self._names.append(name)
+            self._rows[name] = row
+            self._count += 1
+            self._after_insert(row)
+
+    def delete(self, name):
+        with self._lock:
+            if name not in self._rows:
+                return False
+            self._delete_locked(name)
+            if self._count - len(self._rows) > max(16, self._count // 4):
+                self._compact()
+            return True
+
+    def nearest(self, vector, radius):
+        """
+        Returns (name, squared_distance) of the closest template strictly inside
+        `radius`, or None.
+        """
+        query = np.asarray(vector, dtype=np.float32).reshape(-1)
+        if query.shape != (self.dim,):
+            return None
+        with self._lock:
+            if not self._rows:
+                return None
+            row, dist_sq = self._search(query, radius * radius)
+            if row < 0:
+                return None
+            return self._names[row], dist_sq
+
+    # --- Internals (called with the lock held) ---
+    def _grow(self):
+        capacity = len(self._data) * 2
+        data = np.empty((capacity, self.dim), dtype=np.float32)
+        data[:self._count] = self._data[:self._count]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self._count] = self._alive[:self._count]
+        self._data, self._alive = data, alive
+
+    def _delete_locked(self, name):
+        row = self._rows.pop(name)
+        self._alive[row] = False
+        self._names[row] = None
+
+    def _compact(self):
+        keep = np.flatnonzero(self._alive[:self._count])
+        self._data[:len(keep)] = self._data[keep]
+        self._alive[:] = False
+        self._alive[:len(keep)] = True
+        self._names = [self._names[row] for row in keep]
+        self._rows = {name: row for row, name in enumerate(self._names)}
+        self._count = len(keep)
+        self._after_compact()
+
+    def _after_insert(self, row):
+        pass
+
+    def _after_compact(self):
+        pass
+
+    def _scan(self, rows, query, best_row, best_dist_sq):
+        """Batched squared distances over `rows`; returns the improved (row, dist_sq)"""
+        diff = self._data[rows] - query
+        dist_sq = np.einsum('ij,ij->i', diff, diff)
+        dist_sq[~self._alive[rows]] = np.inf
+        i = int(np.argmin(dist_sq))
+        if dist_sq[i] < best_dist_sq:
+            return int(rows[i]), float(dist_sq[i])
+        return best_row, best_dist_sq
+
+    def _search(self, query, radius_sq):
+        return self._scan(np.arange(self._count), query, -1, radius_sq)
+
+
+class _KDNode:
+    __slots__ = ('dim', 'split', 'left', 'right', 'rows')
+
+    def __init__(self, rows=None, dim=0, split=0.0, left=None, right=None):
+        self.rows = rows
+        self.dim = dim
+        self.split = split
+        self.left = left
+        self.right = right
+
+
+class KDTreeTemplateIndex(LinearTemplateIndex):
+    """
+    KD-tree over the template matrix. Leaves hold `leaf_size` rows that are
+    scanned in one batch; branches whose bounding distance exceeds the current
+    best (initially the recognition radius) are pruned.
+
+    New templates go to a small unindexed tail that is scanned linearly until
+    it grows past `rebuild_fraction` of the tree, then the tree is rebuilt.
+    `max_leaves` turns the search approximate by capping the leaves visited.
+    """
+
+    def __init__(self, dim=TEMPLATE_DIM, leaf_size=32, rebuild_fraction=0.1, max_leaves=None):
+        super().__init__(dim)
+        self.leaf_size = leaf_size
+        self.rebuild_fraction = rebuild_fraction
+        self.max_leaves = max_leaves
+        self._root = None
+        self._indexed = 0  # Rows [0, _indexed) are in the tree, the rest are the tail
+
+    def _after_insert(self, row):
+        tail = self._count - self._indexed
+        if tail > max(self.leaf_size, int(self._indexed * self.rebuild_fraction)):
+            self._rebuild()
+
+    def _after_compact(self):
+        self._rebuild()
+
+    def _rebuild(self):
+        rows = np.arange(self._count)
+        self._root = self._build(rows) if len(rows) else None
+        self._indexed = self._count
+
+    def _build(self, rows):
+        if len(rows) <= self.leaf_size:
+            return _KDNode(rows=rows)
+        points = self._data[rows]
+        spread = points.max(axis=0) - points.min(axis=0)
+        dim = int(np.argmax(spread))
+        if spread[dim] == 0:
+            return _KDNode(rows=rows)  # All points identical
+        values = points[:, dim]
+        mid = len(rows) // 2
+        order = np.argpartition(values, mid)
+        return _KDNode(
+            dim=dim,
+            split=float(values[order[mid]]),
+            left=self._build(rows[order[:mid]]),
+            right=self._build(rows[order[mid:]])
+        )
+
+    def _search(self, query, radius_sq):
+        best_row, best_dist_sq = -1, radius_sq
+        leaves_visited = 0
+
+        # Depth-first, nearer child first. Each entry carries a lower bound on
+        # the squared distance from the query to anything in that subtree.
+        stack = [(self._root, 0.0)] if self._root is not None else []
+        while stack:
+            node, bound = stack.pop()
+            if bound >= best_dist_sq:
+                continue
+            if node.rows is not None:
+                best_row, best_dist_sq = self._scan(node.rows, query, best_row, best_dist_sq)
+                leaves_visited += 1
+                if self.max_leaves and leaves_visited >= self.max_leaves:
+                    break
+                continue
+            diff = float(query[node.dim]) - node.split
+            near, far = (node.left, node.right) if diff < 0 else (node.right, node.left)
+            stack.append((far, max(bound, diff * diff)))
+            stack.append((near, bound))
+
+        if self._indexed < self._count:
+            best_row, best_dist_sq = self._scan(
+                np.arange(self._indexed, self._count), query, best_row, best_dist_sq
+            )
+        return best_row, best_dist_sq
+
+
+def make_template_index(kind='linear'):
+    """Factory used by GestureRecognizer for the `custom_gesture_index` setting"""
+    if kind == 'kdtree':
+        return KDTreeTemplateIndex()
+    return LinearTemplateIndex()
+
+
+def benchmark(sizes=(10, 1000, 10000), queries=500, mse_threshold=0.08):
+    """Per-frame match latency for each index at several library sizes"""
+    rng = np.random.default_rng(0)
+    radius = threshold_to_radius(mse_threshold)
+    indexes = {
+        'linear': LinearTemplateIndex,
+        'kdtree': KDTreeTemplateIndex,
+        'kdtree (approx, 4 leaves)': lambda: KDTreeTemplateIndex(max_leaves=4),
+    }
+
+    print(f"{'templates':>10} {'index':>26} {'build ms':>10} {'match us':>10} {'hits':>6}")
+    for size in sizes:
+        # Templates cluster around a few base poses, like real hand shapes do
+        bases = rng.normal(0, 1.0, (max(1, size // 50), TEMPLATE_DIM))
+        templates = bases[rng.integers(0, len(bases), size)] + rng.normal(0, 0.3, (size, TEMPLATE_DIM))
+        probes = templates[rng.integers(0, size, queries)] + rng.normal(0, 0.05, (queries, TEMPLATE_DIM))
+        probes = probes.astype(np.float32)
+
+        for label, factory in indexes.items():
+            index = factory()
+            start = time.perf_counter()
+            for i, template in enumerate(templates):
+                index.insert(f"g{i}", template)
+            build_ms = (time.perf_counter() - start) * 1000
+
+            hits = 0
+            start = time.perf_counter()
+            for probe in probes:
+                if index.nearest(probe, radius):
+                    hits += 1
+            match_us = (time.perf_counter() - start) / queries * 1e6
+            print(f"{size:>10} {label:>26} {build_ms:>10.1f} {match_us:>10.1f} {hits:>6}")
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -8,10 +8,15 @@ import cv2
 import mediapipe as mp
 from mediapipe.tasks import python
 from mediapipe.tasks.python import vision
-from mediapipe.framework.formats import landmark_pb2
 import numpy as np
 import time
-import json
+from collections import deque
+
+from native_threads import threading as native_threading
+from native_threads import time as native_time
+from gesture_index import make_template_index, threshold_to_radius
+from model_registry import models
+from template_store import TemplateStore
 
 # Helper functions for drawing
 _MARGIN = 10  # pixels
@@ -20,99 +25,365 @@ _FONT_SIZE = 1
 _FONT_THICKNESS = 1
 _TEXT_COLOR = (0, 255, 0)  # Green
 _CUSTOM_GESTURE_COLOR = (0, 255, 255) # Yellow for custom gestures
+_LANDMARK_COLOR = (48, 48, 255)  # Red
+_CONNECTION_COLOR = (224, 224, 224)  # Light grey
+
+# The 21-point hand topology (same edges as mp.solutions.hands.HAND_CONNECTIONS)
+_HAND_CONNECTIONS = np.array([
+    (0, 1), (1, 2), (2, 3), (3, 4),         # Thumb
+    (0, 5), (5, 6), (6, 7), (7, 8),         # Index
+    (9, 10), (10, 11), (11, 12),            # Middle
+    (13, 14), (14, 15), (15, 16),           # Ring
+    (0, 17), (17, 18), (18, 19), (19, 20),  # Pinky
+    (5, 9), (9, 13), (13, 17)               # Palm
+])
+
+# Frames stay referenced after process_frame returns, so each preallocated
+# buffer kind is a small ring. A source can have at most this many frames
+# alive at once: its queued results, the LIVE_STREAM frames awaiting a result,
+# the frame being produced and the one the consumer is working on. A smaller
+# ring would overwrite a buffer that is still in use.
+_MAX_PENDING_FRAMES = 3
+_MAX_PENDING_RESULTS = 4
+
+# Failed reads in a row (about 18 s with the backoff) before a camera counts as gone
+_MAX_CONSECUTIVE_READ_FAILURES = 100
+
+
+def _frame_buffer_count(max_pending_results):
+    return max_pending_results + _MAX_PENDING_FRAMES + 2
+
+_GESTURE_MODEL_PATH = 'static/models/gesture_recognizer.task'
+
+
+class _BufferRing:
+    """Fixed set of preallocated image buffers reused in rotation"""
+
+    def __init__(self, size):
+        self.size = size
+        self._buffers = []
+        self._next = 0
+
+    def next(self, shape):
+        if not self._buffers or self._buffers[0].shape != shape:
+            self._buffers = [np.empty(shape, dtype=np.uint8) for _ in range(self.size)]
+            self._next = 0
+        buffer = self._buffers[self._next]
+        self._next = (self._next + 1) % self.size
+        return buffer
+
+
+def normalize_points(points):
+    """
+    Normalizes landmarks based on wrist (0) and middle finger MCP (9).
+    Input: (21, 2+) array of normalized image coordinates.
+    Output: flat (42,) float32 template vector.
+    """
+    xy = points[:, :2]
+    wrist = xy[0]
+    scale = np.linalg.norm(xy[9] - wrist)
+    if scale == 0:
+        scale = 1
+    return ((xy - wrist) / scale).astype(np.float32).reshape(-1)
+
+
+class HandLandmarks:
+    """
+    One detected hand, extracted from MediaPipe once per frame and shared by
+    custom matching, learning, cursor mapping and drawing.
+    points: (21, 3) float32 array of normalized x, y, z
+    normalized: (42,) float32 template vector (see normalize_points)
+    hand_id: position of the hand in the frame's result (0 .. num_hands-1)
+    source_id: camera source the hand was seen by
+    """
+    __slots__ = ('points', 'normalized', 'handedness', 'hand_id', 'source_id')
+
+    def __init__(self, points, handedness='Unknown', hand_id=0, source_id=0):
+        self.points = points
+        self.normalized = normalize_points(points)
+        self.handedness = handedness
+        self.hand_id = hand_id
+        self.source_id = source_id
+
+
+class FrameGrabber:
+    """
+    Reads the camera on a dedicated OS thread and keeps only the newest frame.
+    Older frames that were never consumed are dropped (and counted), so the
+    recognizer always works on the freshest image instead of a stale driver buffer.
+    """
+
+    def __init__(self, camera_index=0, width=640, height=480):
+        self.cap = cv2.VideoCapture(camera_index)
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Not every backend honours this
+
+        self._new_frame = native_threading.Condition()
+        self._frame = None
+        self._seq = 0            # Sequence number of the newest captured frame
+        self._consumed_seq = 0   # Sequence number of the last frame handed out
+
+        # Per-stage counters
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.read_failures = 0          # Lifetime total, for the stats
+        self.consecutive_failures = 0   # Reset by every successful read
+        self.failed = False             # Gave up: the camera never opened or stopped delivering frames
+
+        self.running = self.cap.isOpened()
+        if not self.running:
+            print(f"Could not open camera {camera_index}.")
+            self.failed = True  # Reported like a camera that dies later
+        self._thread = native_threading.Thread(target=self._capture_loop, daemon=True)
+        if self.running:
+            self._thread.start()
+
+    def isOpened(self):
+        return self.running and self.cap.isOpened()
+
+    def _capture_loop(self):
+        while self.running:
+            ret, frame = self.cap.read()
+            if not ret:
+                self.read_failures += 1
+                self.consecutive_failures += 1
+                if self.consecutive_failures > _MAX_CONSECUTIVE_READ_FAILURES:
+                    print("Camera stopped delivering frames.")
+                    self.failed = True
+                    self.running = False
+                    break
+                # A hiccup (USB reset, driver stall) usually clears up; don't spin on it
+                native_time.sleep(min(0.01 * self.consecutive_failures, 0.2))
+                continue
+            self.consecutive_failures = 0
+
+            with self._new_frame:
+                if self._seq != self._consumed_seq:
+                    self.frames_dropped += 1  # Previous frame was never used
+                self._frame = frame
+                self._seq += 1
+                self.frames_captured += 1
+                self._new_frame.notify()
+
+    def read(self, timeout=None):
+        """
+        Returns the newest frame if it has not been handed out yet, otherwise None.
+        Non-blocking by default; with a timeout it waits for the next frame.
+        Only pass a timeout from a native thread, never from the eventlet hub.
+        """
+        with self._new_frame:
+            if self._seq == self._consumed_seq and timeout:
+                self._new_frame.wait(timeout)
+            if self._seq == self._consumed_seq:
+                return None
+            self._consumed_seq = self._seq
+            return self._frame
+
+    def get_stats(self):
+        return {
+            'frames_captured': self.frames_captured,
+            'frames_dropped': self.frames_dropped,
+            'read_failures': self.read_failures,
+            'capture_failed': self.failed
+        }
+
+    def release(self):
+        self.running = False
+        with self._new_frame:
+            self._new_frame.notify_all()
+        if self._thread.is_alive():
+            self._thread.join(timeout=1.0)
+        self.cap.release()
+
+
+class _GestureTask:
+    """
+    A MediaPipe GestureRecognizer task kept in the model registry's pool and
+    reused across start/stop cycles. LIVE_STREAM results go to whichever
+    GestureRecognizer currently holds the task (`on_result`).
+    mode: 'video' or 'live_stream'.
+    """
+    __slots__ = ('recognizer', 'on_result', 'last_timestamp_ms')
+
+    def __init__(self, num_hands=1, mode='video', model_path=_GESTURE_MODEL_PATH):
+        self.on_result = None
+        self.last_timestamp_ms = 0  # Timestamps must keep increasing across owners
+
+        BaseOptions = mp.tasks.BaseOptions
+        GestureRecognizerOptions = mp.tasks.vision.GestureRecognizerOptions
+        VisionRunningMode = mp.tasks.vision.RunningMode
+
+        mode_options = {'running_mode': VisionRunningMode.VIDEO}
+        if mode == 'live_stream':
+            mode_options = {
+                'running_mode': VisionRunningMode.LIVE_STREAM,
+                'result_callback': self._dispatch
+            }
+
+        options = GestureRecognizerOptions(
+            base_options=BaseOptions(model_asset_path=model_path),
+            num_hands=num_hands,
+            min_hand_detection_confidence=0.5,
+            min_hand_presence_confidence=0.5,
+            min_tracking_confidence=0.5,
+            **mode_options
+        )
+        self.recognizer = vision.GestureRecognizer.create_from_options(options)
+
+    def _dispatch(self, recognition_result, output_image, timestamp_ms):
+        on_result = self.on_result
+        if on_result is not None:
+            on_result(recognition_result, output_image, timestamp_ms)
+
+
+def _gesture_task_key(num_hands, mode):
+    return f"gesture_recognizer(num_hands={num_hands}, {mode})"
+
+
+def preload_gesture_model(num_hands=1, engine='video', warm_up=True):
+    """
+    Loads a gesture task into the registry ahead of the first start_gesture.
+    warm_up runs one blank frame through it so the first real frame does not
+    pay for graph initialization (VIDEO engine only).
+    """
+    live_stream = (engine == 'live_stream')
+    mode = 'live_stream' if live_stream else 'video'
+    key = _gesture_task_key(max(1, int(num_hands)), mode)
+    task = models.acquire(key, lambda: _GestureTask(max(1, int(num_hands)), mode))
+    try:
+        if warm_up and not live_stream:
+            blank = np.zeros((256, 256, 3), dtype=np.uint8)
+            timestamp_ms = max(int(native_time.monotonic() * 1000), task.last_timestamp_ms + 1)
+            task.recognizer.recognize_for_video(mp.Image(image_format=mp.ImageFormat.SRGB, data=blank), timestamp_ms)
+            task.last_timestamp_ms = timestamp_ms
+    finally:
+        models.release(key, task)
+
 
 class GestureRecognizer:
-    def __init__(self, camera_index=0, width=640, height=480, config=None):
-        """Initialize gesture recognizer with MediaPipe GestureRecognizer Task"""
+    def __init__(self, camera_index=0, width=640, height=480, config=None, engine='video',
+                 index_kind='linear', num_hands=1, source_id=0, shared_templates=None, template_store=None,
+                 max_pending=_MAX_PENDING_RESULTS):
+        """
+        Initialize gesture recognizer with MediaPipe GestureRecognizer Task.
+        engine='video' blocks on recognize_for_video for every frame;
+        engine='live_stream' submits frames with recognize_async and delivers
+        results to `result_callback(frame, gesture_results, hands)`,
+        letting MediaPipe drop frames itself when inference falls behind.
+        shared_templates: another GestureRecognizer whose custom templates
+        this one should use (one template library across camera sources).
+        template_store: the TemplateStore holding the custom templates
+        (custom_gestures.f32/.json by default).
+        max_pending: size of the result queue this source's frames wait in
+        (GestureWorker); the frame buffer rings are sized from it.
+        """
         
+        self.source_id = source_id
+        self.num_hands = max(1, int(num_hands))
         self.width = width
         self.height = height
-        self.cap = cv2.VideoCapture(camera_index)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        self.cap = FrameGrabber(camera_index, width, height)
+        self.frames_processed = 0
+
+        self.live_stream = (engine == 'live_stream')
+        self.result_callback = None
+        self._pending_frames = {}  # timestamp_ms -> frame awaiting an async result
+        self._pending_lock = native_threading.Lock()
+        self.frames_skipped_by_engine = 0
+
+        # Adaptive keyframes: full inference every Nth frame or on motion, tracking in between
+        self._keyframe = None
+        self._frames_since_keyframe = 0
+        self.frames_tracked = 0
+
+        # Preallocated buffers for the flip / colour-convert stages
+        frame_buffers = _frame_buffer_count(max_pending)
+        self._flip_buffers = _BufferRing(frame_buffers)
+        self._rgb_buffers = _BufferRing(frame_buffers)
+        self._gray_buffers = _BufferRing(2)  # Current frame + the keyframe tracker's previous one
+        self.annotate = True  # Draw landmarks/labels (off when nobody watches the preview)
+
         
         self.config_data = config or {}
         self.running = True
+        self.apply_settings(self.config_data.get('settings', {}))
 
         # --- Load custom gesture data ---
-        self.config_path = 'config.json' 
-        self.recognition_threshold = 0.08 # Tune this sensitivity
-        self.custom_gestures = self._load_custom_gestures()
+        if template_store is None:
+            template_store = shared_templates.template_store if shared_templates is not None else TemplateStore()
+        self.template_store = template_store
+        if shared_templates is not None:
+            self.custom_gestures = shared_templates.custom_gestures
+            self.template_index = shared_templates.template_index
+        else:
+            self.custom_gestures = self._load_custom_gestures()
+            self.template_index = make_template_index(index_kind)
+            for name, template_data in self.custom_gestures.items():
+                try:
+                    self.template_index.insert(name, template_data)
+                except ValueError as e:
+                    print(f"Skipping custom gesture: {e}")
         
-        # Initialize MediaPipe Gesture Recognizer
+        # Initialize MediaPipe Gesture Recognizer (reused from the registry's pool when possible)
+        self._task = None
+        mode = 'live_stream' if self.live_stream else 'video'
+        self._task_key = _gesture_task_key(self.num_hands, mode)
         try:
-            model_path = 'static/models/gesture_recognizer.task'
-            BaseOptions = mp.tasks.BaseOptions
-            GestureRecognizerOptions = mp.tasks.vision.GestureRecognizerOptions
-            VisionRunningMode = mp.tasks.vision.RunningMode
-
-            options = GestureRecognizerOptions(
-                base_options=BaseOptions(model_asset_path=model_path),
-                running_mode=VisionRunningMode.VIDEO,
-                num_hands=1,
-                min_hand_detection_confidence=0.5,
-                min_hand_presence_confidence=0.5,
-                min_tracking_confidence=0.5
+            self._task = models.acquire(
+                self._task_key, lambda: _GestureTask(self.num_hands, mode)
             )
-            self.recognizer = vision.GestureRecognizer.create_from_options(options)
-            print("MediaPipe GestureRecognizer model loaded successfully.")
+            self._task.on_result = self._on_live_result
+            self.recognizer = self._task.recognizer
+            print("MediaPipe GestureRecognizer model ready.")
         except Exception as e:
+            self.cap.release()
             raise Exception(f"Failed to load GestureRecognizer model: {e}. "
-                            f"Make sure 'static/models/gesture_recognizer.task' exists.")
+                            f"Make sure '{_GESTURE_MODEL_PATH}' exists.")
         
-        self.frame_timestamp_ms = 0
+        self.frame_timestamp_ms = self._task.last_timestamp_ms
 
     def _load_custom_gestures(self):
         try:
-            with open(self.config_path, 'r') as f:
-                config = json.load(f)
-            return config.get('custom_gesture_data', {})
-        except FileNotFoundError:
-            print("config.json not found, starting with no custom gestures.")
-            return {}
+            return self.template_store.load()
         except Exception as e:
             print(f"Error loading custom gestures: {e}")
             return {}
 
-    def _save_custom_gestures(self):
+    def _save_custom_gesture(self, name, template):
+        """Appends one template to the binary template store"""
         try:
-            with open(self.config_path, 'r') as f:
-                config = json.load(f)
-            
-            config['custom_gesture_data'] = self.custom_gestures
-            
-            with open(self.config_path, 'w') as f:
-                json.dump(config, f, indent=2)
+            self.template_store.add(name, template)
             print("Custom gestures saved.")
         except Exception as e:
             print(f"Error saving custom gestures: {e}")
 
     # --- MODIFIED: Renamed from _normalize_landmarks to be public ---
-    def normalize_landmarks(self, landmarks):
+    def normalize_landmarks(self, points):
         """
         Normalizes landmarks based on wrist (0) and middle finger MCP (9).
-        Input: list of landmark_pb2.NormalizedLandmark
+        Input: (21, 2+) array of landmarks. Frames already carry this vector
+        as HandLandmarks.normalized.
         """
-        if not landmarks:
-            return np.array([])
-            
-        landmarks_np = np.array([[lm.x, lm.y] for lm in landmarks])
-        
-        wrist = landmarks_np[0]
-        mcp_middle = landmarks_np[9]
-
-        scale = np.linalg.norm(mcp_middle - wrist)
-        if scale == 0:
-            scale = 1 
+        if points is None or not len(points):
+            return np.array([], dtype=np.float32)
+        return normalize_points(np.asarray(points, dtype=np.float32))
 
-        normalized = (landmarks_np - wrist) / scale
-        return normalized.flatten()
+    def _match_template(self, live_template):
+        """
+        Nearest custom template within the recognition threshold.
+        Returns (name, mse) or None. The MSE threshold maps to a radius query.
+        """
+        match = self.template_index.nearest(live_template, threshold_to_radius(self.recognition_threshold))
+        if match is None:
+            return None
+        name, dist_sq = match
+        return name, dist_sq / self.template_index.dim
 
-    def _calculate_distance(self, template1, template2):
-        """Calculates the mean squared error between two normalized landmark templates."""
-        if template1.shape != template2.shape:
-            return float('inf')
-        return np.sum((template1 - template2)**2) / len(template1)
+    def remove_custom_gesture(self, name):
+        """Drops a custom template from memory (the caller removes it from the store)"""
+        self.custom_gestures.pop(name, None)
+        self.template_index.delete(name)
 
     # --- NEW: Method to save an averaged template from many samples ---
     def save_averaged_template(self, samples_list, new_gesture_name):
@@ -127,15 +398,14 @@ class GestureRecognizer:
             avg_template = np.mean(samples_list, axis=0)
             
             # Check for conflicts with existing *custom* gestures
-            for name, template_data in self.custom_gestures.items():
-                saved_template = np.array(template_data)
-                distance = self._calculate_distance(avg_template, saved_template)
-                if distance < self.recognition_threshold:
-                     return {"status": "error", "message": f"Pose is too similar to your existing gesture '{name}'."}
+            conflict = self._match_template(avg_template)
+            if conflict:
+                return {"status": "error", "message": f"Pose is too similar to your existing gesture '{conflict[0]}'."}
 
             # Save the new averaged template
-            self.custom_gestures[new_gesture_name] = avg_template.tolist()
-            self._save_custom_gestures()
+            self.template_index.insert(new_gesture_name, avg_template)
+            self.custom_gestures[new_gesture_name] = avg_template.astype(np.float32)
+            self._save_custom_gesture(new_gesture_name, self.custom_gestures[new_gesture_name])
             
             return {"status": "success", "message": f"Successfully learned '{new_gesture_name}'."}
         except Exception as e:
@@ -145,33 +415,22 @@ class GestureRecognizer:
 
     # --- DELETED: The old learn_new_gesture method is removed ---
 
-    def _recognize_custom(self, hand_landmarks):
+    def _recognize_custom(self, hand):
         """
         Recognizes custom gestures by comparing to saved templates.
-        Input: list of landmark_pb2.NormalizedLandmark
+        Input: HandLandmarks
         """
-        if not self.custom_gestures:
+        if not len(self.template_index):
             return None
             
         try:
-            live_template = self.normalize_landmarks(hand_landmarks) # Use public method
-            
-            min_dist = float('inf')
-            best_match = None
-
-            for name, template_data in self.custom_gestures.items():
-                saved_template = np.array(template_data)
-                distance = self._calculate_distance(live_template, saved_template)
-                
-                if distance < min_dist and distance < self.recognition_threshold:
-                    min_dist = distance
-                    best_match = name
-            
-            if best_match:
+            match = self._match_template(hand.normalized)
+            if match:
+                best_match, min_dist = match
                 return {
                     'gesture': best_match,
                     'confidence': 1.0 - (min_dist / self.recognition_threshold),
-                    'handedness': 'Unknown'
+                    'handedness': hand.handedness
                 }
             return None
         except Exception as e:
@@ -181,47 +440,224 @@ class GestureRecognizer:
         self.running = False
         if self.cap:
             self.cap.release()
-        if hasattr(self, 'recognizer'):
-            self.recognizer.close()
+        if self._task is not None:
+            # Back to the pool instead of close(): the next start skips the model load
+            self._task.on_result = None
+            self._task.last_timestamp_ms = self.frame_timestamp_ms
+            models.release(self._task_key, self._task)
+            self._task = None
             
-    def process_frame(self):
-        """Process a single frame and return frame with gesture result"""
+    def apply_settings(self, settings):
+        """Reads the tunable (no restart needed) options from the settings dict"""
+        # 1 = run MediaPipe on every frame (adaptive keyframes off)
+        self.keyframe_interval = max(1, int(settings.get('keyframe_interval', 1)))
+        # Mean landmark motion in pixels that forces an early keyframe
+        self.motion_threshold = float(settings.get('keyframe_motion_threshold', 3.0))
+        # Custom gesture match sensitivity (MSE against the template)
+        self.recognition_threshold = float(settings.get('custom_gesture_threshold', 0.08))
+
+    def get_stats(self):
+        """Per-stage frame counters for the capture and inference stages"""
+        stats = self.cap.get_stats()
+        stats['frames_processed'] = self.frames_processed
+        stats['frames_skipped_by_engine'] = self.frames_skipped_by_engine
+        stats['frames_tracked'] = self.frames_tracked
+        return stats
+
+    def _next_timestamp_ms(self):
+        """Monotonic, strictly increasing timestamps as MediaPipe requires"""
+        now_ms = int(time.monotonic() * 1000)
+        self.frame_timestamp_ms = max(now_ms, self.frame_timestamp_ms + 1)
+        return self.frame_timestamp_ms
+
+    def _next_frame(self, timeout=None):
+        """Returns the newest camera frame, mirrored, or None"""
         if not self.cap.isOpened():
-            return None, None, None
+            return None
             
-        ret, frame = self.cap.read()
-        if not ret:
-            return None, None, None
+        frame = self.cap.read(timeout)
+        if frame is None:
+            return None
             
-        frame = cv2.flip(frame, 1)
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb_frame)
-        self.frame_timestamp_ms = int(time.time() * 1000)
+        self.frames_processed += 1
+        return cv2.flip(frame, 1, dst=self._flip_buffers.next(frame.shape))
+
+    def _to_mp_image(self, frame):
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._rgb_buffers.next(frame.shape))
+        return mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb_frame)
+
+    def _extract_hands(self, recognition_result):
+        """Converts every detected hand to HandLandmarks in one pass"""
+        hands = []
+        for hand_id, hand_landmarks in enumerate(recognition_result.hand_landmarks or []):
+            points = np.array([(lm.x, lm.y, lm.z) for lm in hand_landmarks], dtype=np.float32)
+            handedness = 'Unknown'
+            if len(recognition_result.handedness) > hand_id and recognition_result.handedness[hand_id]:
+                handedness = recognition_result.handedness[hand_id][0].display_name
+            hands.append(HandLandmarks(points, handedness, hand_id, self.source_id))
+        return hands
+
+    def process_frame(self, timeout=None):
+        """
+        Process the newest camera frame.
+        Returns (annotated_frame, gesture_results, hands): one gesture_result
+        dict (or None) per HandLandmarks in hands. Returns (None, None, None) when the camera is closed or no new frame has
+        arrived since the last call (or within `timeout` seconds).
+        VIDEO engine only; use submit_frame with the LIVE_STREAM engine.
+        """
+        frame = self._next_frame(timeout)
+        if frame is None:
+            return None, None, None
+
+        if self.keyframe_interval > 1:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._gray_buffers.next(frame.shape[:2]))
+            tracked = self._track_between_keyframes(frame, gray)
+            if tracked is not None:
+                return tracked
 
         try:
             recognition_result = self.recognizer.recognize_for_video(
-                mp_image, 
-                self.frame_timestamp_ms
+                self._to_mp_image(frame), 
+                self._next_timestamp_ms()
             )
         except Exception as e:
             print(f"Error during recognition: {e}")
-            return frame, None, None
+            return frame, [], []
+
+        hands = self._extract_hands(recognition_result)
+        gesture_results, text_colors = self._classify(recognition_result, hands)
+        if self.keyframe_interval > 1:
+            self._remember_keyframe(gray, gesture_results, hands, text_colors)
+        return self._annotate(frame, gesture_results, hands, text_colors), gesture_results, hands
+
+    # --- Adaptive keyframes ---
+    def _remember_keyframe(self, gray, gesture_results, hands, text_colors):
+        """
+        Stores what is needed to track until the next keyframe: the 21 landmark
+        pixels of every hand found, otherwise a few background corners so we
+        can still notice a hand moving into view.
+        """
+        h, w = gray.shape
+        if hands:
+            points = np.concatenate([hand.points[:, :2] for hand in hands]) * np.float32((w, h))
+        else:
+            points = cv2.goodFeaturesToTrack(gray, maxCorners=30, qualityLevel=0.01, minDistance=20)
+            points = points.reshape(-1, 2) if points is not None else np.empty((0, 2), dtype=np.float32)
+
+        self._keyframe = {
+            'gray': gray,
+            'points': points.reshape(-1, 1, 2),
+            'hands': hands,
+            'gesture_results': gesture_results,
+            'text_colors': text_colors
+        }
+        self._frames_since_keyframe = 0
+
+    def _track_between_keyframes(self, frame, gray):
+        """
+        Carries the last keyframe forward with pyramidal Lucas-Kanade optical flow.
+        Returns a full (annotated, gestures, hands) result, or None when a new
+        keyframe is due (interval reached, tracking lost, or too much motion).
+        """
+        key = self._keyframe
+        if key is None or self._frames_since_keyframe + 1 >= self.keyframe_interval:
+            return None
+
+        points = key['points']
+        if len(points):
+            new_points, status, _ = cv2.calcOpticalFlowPyrLK(
+                key['gray'], gray, points, None, winSize=(15, 15), maxLevel=2
+            )
+            if new_points is None or not status.all():
+                return None
+            motion = float(np.mean(np.linalg.norm(new_points - points, axis=2)))
+            if motion > self.motion_threshold:
+                return None
+            key['points'] = new_points
+        key['gray'] = gray
+        self._frames_since_keyframe += 1
+        self.frames_tracked += 1
 
-        gesture_result = None
-        landmarks_result = None
-        annotated_image = frame.copy()
+        hands = []
+        if key['hands']:
+            h, w = gray.shape
+            tracked = key['points'].reshape(-1, 21, 2) / np.float32((w, h))
+            for previous, xy in zip(key['hands'], tracked):
+                points = np.empty((21, 3), dtype=np.float32)
+                points[:, :2] = xy
+                points[:, 2] = previous.points[:, 2]
+                hands.append(HandLandmarks(points, previous.handedness, previous.hand_id, previous.source_id))
+        gesture_results = key['gesture_results']
+        return (self._annotate(frame, gesture_results, hands, key['text_colors']),
+                gesture_results, hands)
+
+    def submit_frame(self, timeout=None):
+        """
+        LIVE_STREAM engine: hand the newest camera frame to MediaPipe without
+        waiting for inference. The result arrives later via result_callback.
+        Returns True if a frame was submitted.
+        """
+        with self._pending_lock:
+            backlog = len(self._pending_frames)
+        if backlog >= _MAX_PENDING_FRAMES:
+            # MediaPipe is behind; don't let in-flight frames outrun the buffer ring
+            native_time.sleep(0.005)
+            return False
+
+        frame = self._next_frame(timeout)
+        if frame is None:
+            return False
+        mp_image = self._to_mp_image(frame)
+
+        timestamp_ms = self._next_timestamp_ms()
+        with self._pending_lock:
+            self._pending_frames[timestamp_ms] = frame
+        try:
+            self.recognizer.recognize_async(mp_image, timestamp_ms)
+        except Exception as e:
+            print(f"Error during recognition: {e}")
+            with self._pending_lock:
+                self._pending_frames.pop(timestamp_ms, None)
+            return False
+        return True
+
+    def _on_live_result(self, recognition_result, output_image, timestamp_ms):
+        """MediaPipe result callback (runs on MediaPipe's own thread)"""
+        with self._pending_lock:
+            frame = self._pending_frames.pop(timestamp_ms, None)
+            # Anything older was dropped inside MediaPipe and will never get a result
+            stale = [ts for ts in self._pending_frames if ts < timestamp_ms]
+            for ts in stale:
+                del self._pending_frames[ts]
+            self.frames_skipped_by_engine += len(stale)
+
+        if frame is None or not self.running or self.result_callback is None:
+            return
+        try:
+            hands = self._extract_hands(recognition_result)
+            gesture_results, text_colors = self._classify(recognition_result, hands)
+            annotated_image = self._annotate(frame, gesture_results, hands, text_colors)
+            self.result_callback(annotated_image, gesture_results, hands)
+        except Exception as e:
+            print(f"Error in gesture result callback: {e}")
+
+    def _classify(self, recognition_result, hands):
+        """
+        Picks the built-in or custom gesture for every hand.
+        Returns (gesture_results, text_colors), both aligned with hands.
+        """
+        gesture_results, text_colors = [], []
         
-        if recognition_result.hand_landmarks:
-            landmarks_result = recognition_result.hand_landmarks
-            
-            top_gesture = None
+        for hand in hands:
+            gesture_result = None
             text_color = _TEXT_COLOR
+            top_gesture = None
             
-            if recognition_result.gestures and recognition_result.gestures[0]:
-                top_gesture = recognition_result.gestures[0][0]
+            if len(recognition_result.gestures) > hand.hand_id and recognition_result.gestures[hand.hand_id]:
+                top_gesture = recognition_result.gestures[hand.hand_id][0]
             
             if not top_gesture or top_gesture.category_name == 'None':
-                custom_result = self._recognize_custom(landmarks_result[0])
+                custom_result = self._recognize_custom(hand)
                 if custom_result:
                     gesture_result = custom_result
                     text_color = _CUSTOM_GESTURE_COLOR
@@ -229,40 +665,190 @@ class GestureRecognizer:
                     gesture_result = {
                         'gesture': top_gesture.category_name,
                         'confidence': top_gesture.score,
-                        'handedness': recognition_result.handedness[0][0].display_name
+                        'handedness': hand.handedness
                     }
             else:
                 gesture_result = {
                     'gesture': top_gesture.category_name,
                     'confidence': top_gesture.score,
-                    'handedness': recognition_result.handedness[0][0].display_name
+                    'handedness': hand.handedness
                 }
+
+            if gesture_result:
+                gesture_result['hand_id'] = hand.hand_id
+                gesture_result['source_id'] = self.source_id
+            gesture_results.append(gesture_result)
+            text_colors.append(text_color)
                 
-            hand_landmarks = landmarks_result[0]
-            self.draw_landmarks_on_image(annotated_image, hand_landmarks)
+        return gesture_results, text_colors
+
+    def _annotate(self, frame, gesture_results, hands, text_colors):
+        """Draws landmarks and gesture labels in place (the frame is our own buffer)"""
+        if not self.annotate or not hands:
+            return frame
+
+        h, w = frame.shape[:2]
+        for hand, gesture_result, text_color in zip(hands, gesture_results, text_colors):
+            points = hand.points[:, :2] * np.float32((w, h))
+            self.draw_landmarks_on_image(frame, points)
             
             if gesture_result:
-                x_min = min([lm.x for lm in hand_landmarks]) * self.width
-                y_min = min([lm.y for lm in hand_landmarks]) * self.height
+                x_min, y_min = points.min(axis=0)
                 text_x = int(x_min) - _MARGIN
                 text_y = int(y_min) - _MARGIN
-                cv2.putText(annotated_image, f"{gesture_result['gesture']} ({gesture_result['confidence']:.2f})",
+                cv2.putText(frame, f"{gesture_result['gesture']} ({gesture_result['confidence']:.2f})",
                             (text_x, text_y), cv2.FONT_HERSHEY_DUPLEX,
                             _FONT_SIZE, text_color, _FONT_THICKNESS, cv2.LINE_AA)
             
-        return annotated_image, gesture_result, landmarks_result
-
-    def draw_landmarks_on_image(self, rgb_image, hand_landmarks):
-        hand_landmarks_proto = landmark_pb2.NormalizedLandmarkList()
-        hand_landmarks_proto.landmark.extend([
-            landmark_pb2.NormalizedLandmark(x=landmark.x, y=landmark.y, z=landmark.z) 
-            for landmark in hand_landmarks
-        ])
-        
-        mp.solutions.drawing_utils.draw_landmarks(
-            rgb_image,
-            hand_landmarks_proto,
-            mp.solutions.hands.HAND_CONNECTIONS,
-            mp.solutions.drawing_styles.get_default_hand_landmarks_style(),
-            mp.solutions.drawing_styles.get_default_hand_connections_style()
-        )
\ No newline at end of file
+        return frame
+
+    def draw_landmarks_on_image(self, image, points):
+        """
+        Draws the hand skeleton from a (21, 2) array of pixel coordinates.
+        All connections go out in a single polylines call.
+        """
+        points = points.astype(np.int32)
+        cv2.polylines(image, list(points[_HAND_CONNECTIONS]), False, _CONNECTION_COLOR, 2, cv2.LINE_AA)
+        for x, y in points:
+            cv2.circle(image, (int(x), int(y)), 4, _LANDMARK_COLOR, -1, cv2.LINE_AA)
+
+
+class GestureWorker:
+    """
+    Runs GestureRecognizer.process_frame on a native OS thread.
+    The blocking MediaPipe call can't be made cooperative by eventlet, so it is
+    kept off the hub entirely; results are handed back through a bounded deque
+    that the green-thread gesture loop polls without blocking.
+    Each result is (source_id, frame, gesture_results, hands).
+    The deque belongs to this source alone, so the number of its frames in
+    flight stays within what the recognizer's buffer rings were sized for.
+    """
+
+    def __init__(self, recognizer, max_pending=_MAX_PENDING_RESULTS):
+        self.recognizer = recognizer
+        self.results = deque(maxlen=max_pending)
+        self.results_dropped = 0
+        self.running = False
+        self._thread = native_threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.running = True
+        self._thread.start()
+
+    def _run(self):
+        if self.recognizer.live_stream:
+            # Results are pushed from MediaPipe's callback; this thread only feeds frames
+            self.recognizer.result_callback = self._push
+        while self.running and self.recognizer.running:
+            try:
+                if self.recognizer.live_stream:
+                    self.recognizer.submit_frame(timeout=0.1)
+                    continue
+                frame, gesture_results, hands = self.recognizer.process_frame(timeout=0.1)
+            except Exception as e:
+                print(f"Error in gesture worker: {e}")
+                continue
+            if frame is None:
+                continue
+            self._push(frame, gesture_results, hands)
+        print(f"Gesture worker {self.recognizer.source_id} stopped.")
+
+    def _push(self, frame, gesture_results, hands):
+        if len(self.results) == self.results.maxlen:
+            self.results_dropped += 1  # Oldest result is pushed out
+        self.results.append((self.recognizer.source_id, frame, gesture_results, hands))
+
+    def poll(self):
+        """Non-blocking. Returns the oldest pending result or None."""
+        try:
+            return self.results.popleft()
+        except IndexError:
+            return None
+
+    def get_stats(self):
+        stats = self.recognizer.get_stats()
+        stats['source_id'] = self.recognizer.source_id
+        stats['results_dropped'] = self.results_dropped
+        return stats
+
+    def stop(self):
+        """Stop the worker thread first, then release the camera and model."""
+        self.running = False
+        if self._thread.is_alive():
+            self._thread.join(timeout=1.0)
+        self.recognizer.result_callback = None
+        self.recognizer.stop()
+
+
+class GesturePipeline:
+    """
+    One GestureRecognizer + GestureWorker per camera source; poll() takes
+    results from the sources' queues in turn. Every source has its own capture and inference
+    threads, so throughput scales across cores (OpenCV and MediaPipe release
+    the GIL). All sources share the custom template library of the first one.
+    """
+
+    def __init__(self, camera_indices, width=640, height=480, config=None, engine='video',
+                 index_kind='linear', num_hands=1, max_pending=_MAX_PENDING_RESULTS, template_store=None):
+        self.recognizers = []
+        self.workers = []
+        self._next_worker = 0  # Round-robin position for poll()
+        try:
+            for source_id, camera_index in enumerate(camera_indices):
+                recognizer = GestureRecognizer(
+                    camera_index=camera_index, width=width, height=height, config=config,
+                    engine=engine, index_kind=index_kind, num_hands=num_hands, source_id=source_id,
+                    shared_templates=self.recognizers[0] if self.recognizers else None,
+                    template_store=template_store, max_pending=max_pending
+                )
+                self.recognizers.append(recognizer)
+                self.workers.append(GestureWorker(recognizer, max_pending=max_pending))
+        except Exception:
+            for recognizer in self.recognizers:
+                recognizer.stop()
+            raise
+
+    @property
+    def primary(self):
+        """Source 0; owns the template library used for learning and deleting"""
+        return self.recognizers[0]
+
+    def is_active(self):
+        return any(recognizer.cap.isOpened() for recognizer in self.recognizers)
+
+    def failed_sources(self):
+        """Source ids whose camera failed to open or stopped delivering frames"""
+        return [recognizer.source_id for recognizer in self.recognizers if recognizer.cap.failed]
+
+    def set_annotate(self, enabled):
+        for recognizer in self.recognizers:
+            recognizer.annotate = enabled
+
+    def apply_settings(self, settings):
+        """Hot-applies tunable settings to every source; takes effect on the next frame"""
+        for recognizer in self.recognizers:
+            recognizer.apply_settings(settings)
+
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+
+    def poll(self):
+        """
+        Non-blocking. Returns the next (source_id, frame, gesture_results, hands)
+        or None. Sources take turns, so a fast camera can't starve a slow one.
+        """
+        for _ in range(len(self.workers)):
+            worker = self.workers[self._next_worker]
+            self._next_worker = (self._next_worker + 1) % len(self.workers)
+            result = worker.poll()
+            if result is not None:
+                return result
+        return None
+
+    def get_stats(self):
+        return [worker.get_stats() for worker in self.workers]
+
+    def stop(self):
+        for worker in self.workers:
+            worker.stop()
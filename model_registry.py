@@ -0,0 +1,76 @@
+"""
+Model Registry
+Loads the heavy models (Vosk, MediaPipe) once per process and keeps them
+across start/stop cycles, so toggling a modality does not reload anything
+from disk. Load times are recorded and reported through /api/stats.
+
+Two kinds of entries:
+  * shared  - `get(key, loader)`: one immutable object used by everyone (Vosk Model)
+  * pooled  - `acquire(key, factory)` / `release(key, obj)`: stateful objects
+              that only one user may hold at a time (MediaPipe task instances)
+"""
+
+from native_threads import threading as native_threading
+from native_threads import time as native_time
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._lock = native_threading.Lock()
+        self._loading = {}   # key -> Lock, so a model is never loaded twice in parallel
+        self._shared = {}    # key -> object
+        self._pools = {}     # key -> [idle objects]
+        self.load_times_ms = {}
+        self.reuses = 0
+
+    def _timed_load(self, key, loader):
+        start = native_time.perf_counter()
+        obj = loader()
+        elapsed_ms = (native_time.perf_counter() - start) * 1000
+        with self._lock:
+            self.load_times_ms.setdefault(key, []).append(round(elapsed_ms, 1))
+        print(f"Loaded {key} in {elapsed_ms:.0f} ms")
+        return obj
+
+    def get(self, key, loader):
+        """Returns the shared object for `key`, calling `loader()` the first time"""
+        with self._lock:
+            if key in self._shared:
+                self.reuses += 1
+                return self._shared[key]
+            key_lock = self._loading.setdefault(key, native_threading.Lock())
+        with key_lock:
+            with self._lock:
+                if key in self._shared:
+                    self.reuses += 1
+                    return self._shared[key]
+            obj = self._timed_load(key, loader)
+            with self._lock:
+                self._shared[key] = obj
+            return obj
+
+    def acquire(self, key, factory):
+        """Takes an idle pooled object for `key`, or creates one with `factory()`"""
+        with self._lock:
+            idle = self._pools.setdefault(key, [])
+            if idle:
+                self.reuses += 1
+                return idle.pop()
+        return self._timed_load(key, factory)
+
+    def release(self, key, obj):
+        """Returns a pooled object for the next user"""
+        with self._lock:
+            self._pools.setdefault(key, []).append(obj)
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'load_times_ms': {key: list(times) for key, times in self.load_times_ms.items()},
+                'idle': {key: len(idle) for key, idle in self._pools.items()},
+                'reuses': self.reuses
+            }
+
+
+# Process-wide registry shared by the recognizers
+models = ModelRegistry()
@@ -0,0 +1,29 @@
+"""
+Native Threading Helpers
+app.py calls eventlet.monkey_patch(), which turns threading, time and queue into
+green versions. Blocking native calls (camera reads, MediaPipe, Vosk, TTS) need
+real OS threads so they do not freeze the Socket.IO hub. This module exposes the
+original, unpatched modules for that purpose.
+"""
+
+try:
+    from eventlet import patcher as _patcher
+    from eventlet import tpool as _tpool
+
+    threading = _patcher.original('threading')
+    time = _patcher.original('time')
+    queue = _patcher.original('queue')
+
+    def run_native(func, *args, **kwargs):
+        """Run a blocking call on eventlet's native thread pool and yield to the hub meanwhile"""
+        return _tpool.execute(func, *args, **kwargs)
+
+except ImportError:
+    # Plain threading when eventlet is not installed (e.g. standalone scripts)
+    import threading
+    import time
+    import queue
+
+    def run_native(func, *args, **kwargs):
+        """Run a blocking call directly (no eventlet hub to protect)"""
+        return func(*args, **kwargs)
@@ -41,9 +41,23 @@ document.querySelectorAll(".tab-btn").forEach((btn) => {
       .querySelectorAll(".tab-content")
       .forEach((content) => content.classList.remove("active"));
     document.getElementById(tabName).classList.add("active");
+    updatePreviewSubscription();
   });
 });
 
+// Only ask for preview frames while the dashboard is actually visible
+let previewSubscribed = false;
+function updatePreviewSubscription() {
+  const dashboardVisible =
+    document.visibilityState === "visible" &&
+    document.getElementById("dashboard").classList.contains("active");
+  if (dashboardVisible !== previewSubscribed) {
+    socket.emit(dashboardVisible ? "preview_subscribe" : "preview_unsubscribe");
+    previewSubscribed = dashboardVisible;
+  }
+}
+document.addEventListener("visibilitychange", updatePreviewSubscription);
+
 // Gesture toggle
 gestureToggle.addEventListener("change", () => {
   if (gestureToggle.checked) {
@@ -72,6 +86,8 @@ voiceToggle.addEventListener("change", () => {
 // Socket.IO events
 socket.on("connect", () => {
   console.log("Connected to server");
+  previewSubscribed = false; // Server forgets subscriptions on reconnect
+  updatePreviewSubscription();
 });
 
 socket.on("gesture_status", (data) => {
@@ -88,15 +104,7 @@ socket.on("gesture_recognized", (data) => {
     data.confidence * 100
   ).toFixed(1)}%) → Action: ${data.action || "None"}`;
 
-  // Only increment counters for valid actions, not for "None" or toggles
   gestureCount.textContent = parseInt(gestureCount.textContent) + 1;
-  if (
-    data.action &&
-    data.action !== "None" &&
-    !data.action.startsWith("Cursor Mode")
-  ) {
-    actionCount.textContent = parseInt(actionCount.textContent) + 1;
-  }
 });
 
 socket.on("voice_recognized", (data) => {
@@ -104,13 +112,33 @@ socket.on("voice_recognized", (data) => {
     data.action || "None"
   }`;
   commandCount.textContent = parseInt(commandCount.textContent) + 1;
-  if (data.action && data.action !== "None") {
+});
+
+// Actions run in the background on the server; count them once they are done
+socket.on("action_completed", (data) => {
+  if (data.success) {
     actionCount.textContent = parseInt(actionCount.textContent) + 1;
   }
+  console.log(
+    `Action ${data.action} (${data.source}): ${data.success ? "done" : "failed"} in ${data.latency_ms} ms`
+  );
 });
 
-socket.on("video_frame", (data) => {
-  videoFeed.src = "data:image/jpeg;base64," + data.frame;
+// Preview frames arrive as binary JPEG attachments. Acknowledging each one
+// tells the server we are ready for the next (it drops frames meanwhile).
+let videoFrameUrl = null;
+socket.on("video_frame", (data, ack) => {
+  const url = URL.createObjectURL(
+    new Blob([data.frame], { type: "image/jpeg" })
+  );
+  videoFeed.src = url;
+  if (videoFrameUrl) {
+    URL.revokeObjectURL(videoFrameUrl);
+  }
+  videoFrameUrl = url;
+  if (ack) {
+    ack();
+  }
 });
 
 socket.on("error", (data) => {
@@ -257,9 +285,16 @@ saveSettingsBtn.addEventListener("click", () => {
     .then((r) => r.json())
     .then((data) => {
       if (data.success) {
-        alert(
-          "Settings saved successfully! Restarting gesture recognition if active."
-        );
+        const label = (module) => module + " recognition";
+        let message = "Settings saved successfully!";
+        if (data.restarted && data.restarted.length) {
+          message += " Restarted " + data.restarted.map(label).join(" and ") + ".";
+        }
+        if (data.failed && data.failed.length) {
+          message +=
+            " Could not restart " + data.failed.map(label).join(" and ") + ".";
+        }
+        alert(message);
       } else {
         alert("Error saving settings: " + data.error);
       }
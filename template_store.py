@@ -0,0 +1,166 @@
+"""
+Custom Gesture Template Store
+Keeps the learned gesture templates out of config.json, in two files:
+  <name>.f32   - append-only float32 records, one `dim`-float template per row
+                 (<name>.<generation>.f32 after a compaction)
+  <name>.json  - small index: {"dim": 42, "data": data file name, "generation": n,
+                 "count": rows written, "rows": {name: row}}
+Loading is a single read of the data file. Adding a template appends one row
+and rewrites only the index (atomically). Deleted rows are dropped from the
+index and reclaimed by a compaction once they make up a quarter of the file.
+A compaction writes a new data file and then switches the index to it, so
+the index never points at rows of a different file.
+"""
+
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from native_threads import threading as native_threading
+
+TEMPLATE_DIM = 42
+
+
+def _atomic_write(path, write):
+    """Writes through a temp file in the same directory and renames it into place"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.templates-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class TemplateStore:
+    def __init__(self, base_path='custom_gestures', dim=TEMPLATE_DIM):
+        self.base_path = base_path
+        self.data_path = base_path + '.f32'
+        self.index_path = base_path + '.json'
+        self.dim = dim
+        self._lock = native_threading.Lock()
+        self._rows = {}   # Name -> row in the data file
+        self._count = 0   # Rows in the data file, including deleted ones
+        self._generation = 0  # Bumped by every compaction (names the data file)
+        self._read_index()
+
+    def _read_index(self):
+        try:
+            with open(self.index_path, 'r') as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            return
+        except json.JSONDecodeError as e:
+            print(f"Error reading {self.index_path}: {e}. Starting with no custom gestures.")
+            return
+        if index.get('dim', self.dim) != self.dim:
+            print(f"Ignoring {self.index_path}: templates have {index.get('dim')} values, expected {self.dim}")
+            return
+        self._rows = dict(index.get('rows', {}))
+        self._count = int(index.get('count', 0))
+        self._generation = int(index.get('generation', 0))
+        if index.get('data'):
+            self.data_path = os.path.join(os.path.dirname(self.index_path), index['data'])
+
+    def _write_index(self):
+        index = json.dumps({
+            'dim': self.dim,
+            'data': os.path.basename(self.data_path),
+            'generation': self._generation,
+            'count': self._count,
+            'rows': self._rows
+        }, indent=2)
+        _atomic_write(self.index_path, lambda f: f.write(index.encode('utf-8')))
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, name):
+        return name in self._rows
+
+    def names(self):
+        return list(self._rows)
+
+    def load(self):
+        """All templates as {name: float32 vector}, from one read of the data file"""
+        with self._lock:
+            if not self._rows:
+                return {}
+            try:
+                data = np.fromfile(self.data_path, dtype=np.float32)
+            except FileNotFoundError:
+                print(f"{self.data_path} is missing; custom gestures lost.")
+                return {}
+            # Rows past `count` come from an append whose index update never happened
+            rows = min(self._count, len(data) // self.dim)
+            data = data[:rows * self.dim].reshape(rows, self.dim)
+            return {name: data[row] for name, row in self._rows.items() if row < rows}
+
+    def add(self, name, template):
+        """Appends one template (replacing any template with the same name)"""
+        vector = np.asarray(template, dtype=np.float32).reshape(-1)
+        if vector.shape != (self.dim,):
+            raise ValueError(f"Template '{name}' has shape {vector.shape}, expected ({self.dim},)")
+        with self._lock:
+            with open(self.data_path, 'ab') as f:
+                # Drop a torn record left by an interrupted append before adding ours
+                f.truncate(self._count * self.dim * 4)
+                f.seek(0, os.SEEK_END)
+                f.write(vector.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            self._rows[name] = self._count
+            self._count += 1
+            self._write_index()
+
+    def remove(self, name):
+        with self._lock:
+            if self._rows.pop(name, None) is None:
+                return False
+            if self._count - len(self._rows) > max(16, self._count // 4):
+                self._compact()
+            else:
+                self._write_index()
+            return True
+
+    def _compact(self):
+        """
+        Copies the live rows into a new data file (lock held). The index is
+        switched to the new file last, so a crash at any point leaves an index
+        that matches the data file it names.
+        """
+        data = np.fromfile(self.data_path, dtype=np.float32)[:self._count * self.dim].reshape(-1, self.dim)
+        names = list(self._rows)
+        kept = data[[self._rows[name] for name in names]] if names else np.empty((0, self.dim), np.float32)
+        old_path = self.data_path
+        generation = self._generation + 1
+        new_path = f"{self.base_path}.{generation}.f32"
+        _atomic_write(new_path, lambda f: f.write(np.ascontiguousarray(kept).tobytes()))
+
+        self.data_path = new_path
+        self._generation = generation
+        self._rows = {name: row for row, name in enumerate(names)}
+        self._count = len(names)
+        self._write_index()
+        try:
+            os.remove(old_path)
+        except OSError as e:
+            print(f"Could not remove old template data {old_path}: {e}")
+
+    def import_templates(self, templates):
+        """Adds {name: template} entries (e.g. legacy custom_gesture_data from config.json)"""
+        imported = 0
+        for name, template in templates.items():
+            try:
+                self.add(name, template)
+                imported += 1
+            except ValueError as e:
+                print(f"Skipping custom gesture: {e}")
+        return imported
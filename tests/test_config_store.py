@@ -0,0 +1,166 @@
+import json
+import os
+import time
+
+import pytest
+
+import config_store
+from config_store import ConfigStore, thaw
+
+CONFIG = {'settings': {'gesture_cooldown': 0.5, 'camera_indices': [0, 1]}, 'gestures': {}}
+
+
+def _write_config(path, data):
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
+
+def _read_config(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _hand_edit(path, data):
+    """Rewrites the file behind the store's back with a newer mtime"""
+    _write_config(path, data)
+    stamp = os.path.getmtime(path) + 10
+    os.utime(path, (stamp, stamp))
+
+
+def _wait_flushed(store, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while store.flushed_version != store.version:
+        assert time.monotonic() < deadline, 'flusher did not write the pending change'
+        time.sleep(0.01)
+
+
+def _set_cooldown(value):
+    return lambda cfg: cfg['settings'].__setitem__('gesture_cooldown', value)
+
+
+def test_missing_file_writes_default(tmp_path):
+    path = str(tmp_path / 'config.json')
+    store = ConfigStore(path, default_factory=lambda: json.loads(json.dumps(CONFIG)), flush_delay=0.01)
+    _wait_flushed(store)
+    assert _read_config(path) == CONFIG
+    store.close()
+
+
+def test_corrupt_file_uses_default(tmp_path):
+    path = tmp_path / 'config.json'
+    path.write_text('{"settings": ')
+    store = ConfigStore(str(path), default_factory=lambda: {'settings': {}}, flush_delay=0.01)
+    assert thaw(store.snapshot()) == {'settings': {}}
+    _wait_flushed(store)
+    assert _read_config(path) == {'settings': {}}
+    store.close()
+
+
+def test_updates_are_coalesced(tmp_path):
+    path = str(tmp_path / 'config.json')
+    _write_config(path, CONFIG)
+    store = ConfigStore(path, flush_delay=0.2)
+    for i in range(20):
+        store.update(_set_cooldown(i))
+    _wait_flushed(store)
+    assert store.writes == 1
+    assert _read_config(path)['settings']['gesture_cooldown'] == 19
+    assert list(tmp_path.glob('.config-*.tmp')) == []
+    store.close()
+
+
+def test_failed_write_leaves_file_intact(tmp_path, monkeypatch):
+    path = str(tmp_path / 'config.json')
+    _write_config(path, CONFIG)
+    store = ConfigStore(path, flush_delay=60)
+
+    def fail(src, dst):
+        raise OSError('disk full')
+    monkeypatch.setattr(config_store.os, 'replace', fail)
+    assert not store._write({'settings': {}})
+    monkeypatch.undo()
+
+    assert _read_config(path) == CONFIG
+    assert list(tmp_path.glob('.config-*.tmp')) == []
+    store.close()
+
+
+def test_failed_mutator_changes_nothing(tmp_path):
+    path = str(tmp_path / 'config.json')
+    _write_config(path, CONFIG)
+    store = ConfigStore(path, flush_delay=60)
+    before = store.snapshot()
+    version = store.version
+
+    def apply(cfg):
+        cfg['settings']['gesture_cooldown'] = 3.0
+        raise KeyError('missing')
+    with pytest.raises(KeyError):
+        store.update(apply)
+
+    assert store.version == version
+    assert store.snapshot() is before
+    assert thaw(store.snapshot()) == CONFIG
+    store.close()
+    assert store.writes == 0
+
+
+def test_snapshots_are_frozen(tmp_path):
+    path = str(tmp_path / 'config.json')
+    _write_config(path, CONFIG)
+    store = ConfigStore(path, flush_delay=60)
+    snapshot = store.snapshot()
+    with pytest.raises(TypeError):
+        snapshot['settings']['gesture_cooldown'] = 3.0
+    assert snapshot['settings']['camera_indices'] == (0, 1)
+
+    store.update(_set_cooldown(3.0))
+    assert snapshot['settings']['gesture_cooldown'] == 0.5  # Published snapshots never change
+    assert store.snapshot()['settings']['gesture_cooldown'] == 3.0
+
+    plain = thaw(snapshot)
+    plain['settings']['camera_indices'].append(2)
+    assert snapshot['settings']['camera_indices'] == (0, 1)
+    store.close()
+
+
+def test_refresh_picks_up_hand_edits(tmp_path):
+    path = str(tmp_path / 'config.json')
+    _write_config(path, CONFIG)
+    store = ConfigStore(path, flush_delay=60)
+    assert not store.refresh()  # Unchanged on disk
+
+    edited = dict(CONFIG, gestures={'Wave': {'name': 'Wave', 'action': 'click'}})
+    _hand_edit(path, edited)
+    assert store.refresh()
+    assert thaw(store.snapshot()) == edited
+    assert store.flushed_version == store.version  # Nothing to write back
+    assert not store.refresh()
+    store.close()
+    assert store.writes == 0
+
+
+def test_refresh_skipped_while_write_pending(tmp_path):
+    path = str(tmp_path / 'config.json')
+    _write_config(path, CONFIG)
+    store = ConfigStore(path, flush_delay=60)
+    store.update(_set_cooldown(3.0))
+
+    _hand_edit(path, dict(CONFIG, gestures={'Wave': {'name': 'Wave', 'action': 'click'}}))
+    assert not store.refresh()
+    assert store.snapshot()['settings']['gesture_cooldown'] == 3.0
+
+    # The pending change wins; close() writes it without waiting for the debounce
+    store.close()
+    assert _read_config(path)['settings']['gesture_cooldown'] == 3.0
+    assert _read_config(path)['gestures'] == {}
+
+
+def test_close_writes_pending_change(tmp_path):
+    path = str(tmp_path / 'config.json')
+    _write_config(path, CONFIG)
+    store = ConfigStore(path, flush_delay=60)
+    store.update(_set_cooldown(1.5))
+    store.close()
+    assert store.flushed_version == store.version
+    assert _read_config(path)['settings']['gesture_cooldown'] == 1.5
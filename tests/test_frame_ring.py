@@ -0,0 +1,89 @@
+import uuid
+
+import numpy as np
+import pytest
+
+from frame_ring import FrameRingReader, FrameRingWriter
+
+SHAPE = (6, 8, 3)
+
+
+def _frame(value):
+    return np.full(SHAPE, value, dtype=np.uint8)
+
+
+@pytest.fixture
+def ring():
+    writer = FrameRingWriter(f"test_ring_{uuid.uuid4().hex[:8]}", slots=4)
+    writer.publish(_frame(0))  # Creates the shared memory block
+    reader = FrameRingReader(writer.name)
+    reader.last_seq = writer.frames_published
+    yield writer, reader
+    reader.close()
+    writer.close()
+
+
+def test_latest_returns_newest_frame(ring):
+    writer, reader = ring
+    writer.publish(_frame(1), source_id=0)
+    writer.publish(_frame(2), source_id=1)
+    latest = reader.latest()
+    assert latest.seq == 3
+    assert latest.source_id == 1
+    assert latest.frame.shape == SHAPE
+    assert (latest.frame == 2).all()
+    assert not latest.frame.flags.writeable
+    assert latest.valid()
+
+
+def test_next_reads_every_frame_in_order(ring):
+    writer, reader = ring
+    for value in (1, 2, 3):
+        writer.publish(_frame(value))
+    values = []
+    while (ring_frame := reader.next(copy=True)) is not None:
+        values.append(int(ring_frame.frame[0, 0, 0]))
+    assert values == [1, 2, 3]
+    assert reader.frames_missed == 0
+    assert reader.next() is None  # Caught up
+
+    writer.publish(_frame(4))
+    assert int(reader.next(copy=True).frame[0, 0, 0]) == 4
+
+
+def test_reader_falling_behind_skips_overwritten_frames(ring):
+    writer, reader = ring
+    for value in range(1, 11):  # Laps the 4-slot ring twice
+        writer.publish(_frame(value))
+    values = []
+    while (ring_frame := reader.next(copy=True)) is not None:
+        values.append(int(ring_frame.frame[0, 0, 0]))
+    # Only frames still in the ring come back, in order, ending with the newest
+    assert values == sorted(values) and values[-1] == 10
+    assert len(values) < writer.slots
+    assert reader.frames_missed == 10 - len(values)
+
+
+def test_slot_wraparound_invalidates_old_views(ring):
+    writer, reader = ring
+    writer.publish(_frame(1))
+    view = reader.latest()
+    private = reader.latest(copy=True)
+    for value in range(2, 2 + writer.slots):  # Wraps around onto the viewed slot
+        writer.publish(_frame(value))
+    assert not view.valid()
+    assert (private.frame == 1).all()  # The copy is unaffected
+    del view
+
+
+def test_frames_larger_than_the_slots_are_dropped(ring):
+    writer, reader = ring
+    count = reader.write_count()
+    assert writer.publish(np.zeros((12, 16, 3), dtype=np.uint8)) is None
+    assert writer.frames_dropped == 1
+    assert reader.write_count() == count
+
+
+def test_reader_rejects_unknown_ring():
+    with pytest.raises(FileNotFoundError):
+        FrameRingReader(f"missing_ring_{uuid.uuid4().hex[:8]}")
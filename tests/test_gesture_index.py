@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from gesture_index import (
+    TEMPLATE_DIM, KDTreeTemplateIndex, LinearTemplateIndex, make_template_index, threshold_to_radius
+)
+
+
+def _fill(index, templates):
+    for i, template in enumerate(templates):
+        index.insert(f"g{i}", template)
+    return index
+
+
+def test_empty_index_has_no_match():
+    for index in (LinearTemplateIndex(), KDTreeTemplateIndex()):
+        assert index.nearest(np.zeros(TEMPLATE_DIM), radius=100.0) is None
+
+
+def test_single_template():
+    template = np.random.default_rng(1).normal(size=TEMPLATE_DIM)
+    for index in (LinearTemplateIndex(), KDTreeTemplateIndex()):
+        index.insert('only', template)
+        name, dist_sq = index.nearest(template + 0.01, radius=1.0)
+        assert name == 'only'
+        assert dist_sq == pytest.approx(TEMPLATE_DIM * 0.01 ** 2, rel=1e-3)
+
+
+@pytest.mark.parametrize('count', [1, 10, 100, 2000])
+def test_kdtree_matches_linear_scan(count):
+    rng = np.random.default_rng(count)
+    templates = rng.normal(size=(count, TEMPLATE_DIM)).astype(np.float32)
+    linear = _fill(LinearTemplateIndex(), templates)
+    kdtree = _fill(KDTreeTemplateIndex(leaf_size=8), templates)
+
+    # Queries near stored templates and far from all of them
+    queries = np.concatenate([
+        templates[rng.integers(0, count, 50)] + rng.normal(scale=0.3, size=(50, TEMPLATE_DIM)),
+        rng.normal(scale=3.0, size=(50, TEMPLATE_DIM))
+    ])
+    radius = threshold_to_radius(0.5)
+    for query in queries:
+        expected = linear.nearest(query, radius)
+        found = kdtree.nearest(query, radius)
+        if expected is None:
+            assert found is None
+        else:
+            assert found[0] == expected[0]
+            assert found[1] == pytest.approx(expected[1], rel=1e-5)
+
+
+def test_kdtree_matches_linear_after_deletes_and_inserts():
+    rng = np.random.default_rng(7)
+    templates = rng.normal(size=(300, TEMPLATE_DIM)).astype(np.float32)
+    linear = _fill(LinearTemplateIndex(), templates)
+    kdtree = _fill(KDTreeTemplateIndex(leaf_size=8), templates)
+    for i in range(0, 300, 3):  # Enough deletes to trigger a compaction
+        assert linear.delete(f"g{i}") and kdtree.delete(f"g{i}")
+    for i in range(20):  # New rows land in the kd-tree's unindexed tail
+        extra = rng.normal(size=TEMPLATE_DIM)
+        linear.insert(f"new{i}", extra)
+        kdtree.insert(f"new{i}", extra)
+
+    assert sorted(linear.names()) == sorted(kdtree.names())
+    radius = threshold_to_radius(2.0)
+    for query in rng.normal(size=(100, TEMPLATE_DIM)):
+        expected, found = linear.nearest(query, radius), kdtree.nearest(query, radius)
+        assert (found and found[0]) == (expected and expected[0])
+
+
+def test_threshold_excludes_templates_outside_radius():
+    template = np.zeros(TEMPLATE_DIM, dtype=np.float32)
+    query = template + 0.5  # MSE 0.25 against the template
+    for kind in ('linear', 'kdtree'):
+        index = make_template_index(kind)
+        index.insert('pose', template)
+        assert index.nearest(query, threshold_to_radius(0.08)) is None
+        assert index.nearest(query, threshold_to_radius(0.3))[0] == 'pose'
+
+
+def test_wrong_shape():
+    index = LinearTemplateIndex()
+    with pytest.raises(ValueError):
+        index.insert('bad', np.zeros(10))
+    index.insert('ok', np.zeros(TEMPLATE_DIM))
+    assert index.nearest(np.zeros(10), radius=1.0) is None
@@ -0,0 +1,108 @@
+import json
+
+import numpy as np
+import pytest
+
+from template_store import TEMPLATE_DIM, TemplateStore
+
+
+def _template(value):
+    return np.full(TEMPLATE_DIM, value, dtype=np.float32)
+
+
+def _check(templates, expected):
+    """Every name maps to the row it was stored with (row value == stored value)"""
+    assert set(templates) == set(expected)
+    for name, value in expected.items():
+        np.testing.assert_array_equal(templates[name], _template(value))
+
+
+def test_add_and_reload(tmp_path):
+    base = str(tmp_path / 'custom_gestures')
+    store = TemplateStore(base)
+    store.add('wave', _template(1))
+    store.add('point', _template(2))
+    assert len(store) == 2 and 'wave' in store
+
+    _check(TemplateStore(base).load(), {'wave': 1, 'point': 2})
+
+
+def test_replace_keeps_latest(tmp_path):
+    base = str(tmp_path / 'custom_gestures')
+    store = TemplateStore(base)
+    store.add('wave', _template(1))
+    store.add('wave', _template(5))
+    _check(TemplateStore(base).load(), {'wave': 5})
+
+
+def test_remove(tmp_path):
+    base = str(tmp_path / 'custom_gestures')
+    store = TemplateStore(base)
+    store.add('wave', _template(1))
+    store.add('point', _template(2))
+    assert store.remove('wave')
+    assert not store.remove('wave')
+    _check(TemplateStore(base).load(), {'point': 2})
+
+
+def test_compaction_keeps_names_on_their_rows(tmp_path):
+    base = str(tmp_path / 'custom_gestures')
+    store = TemplateStore(base)
+    for i in range(60):
+        store.add(f"g{i}", _template(i))
+    for i in range(0, 60, 2):  # Past the compaction threshold
+        store.remove(f"g{i}")
+
+    index = json.loads((tmp_path / 'custom_gestures.json').read_text())
+    assert index['generation'] >= 1
+    assert index['count'] < 60  # Deleted rows were reclaimed
+    assert not (tmp_path / 'custom_gestures.f32').exists()  # Old generation removed
+
+    expected = {f"g{i}": i for i in range(1, 60, 2)}
+    _check(TemplateStore(base).load(), expected)
+
+    # Appends after a compaction go to the new data file
+    store.add('late', _template(99))
+    expected['late'] = 99
+    _check(TemplateStore(base).load(), expected)
+
+
+def test_crash_before_index_switch_keeps_old_generation(tmp_path):
+    base = str(tmp_path / 'custom_gestures')
+    store = TemplateStore(base)
+    for i in range(40):
+        store.add(f"g{i}", _template(i))
+    for i in range(16):
+        store.remove(f"g{i}")
+
+    write_index = store._write_index
+    def crash():
+        if store._generation:
+            raise OSError('simulated crash')
+        write_index()
+    store._write_index = crash
+    with pytest.raises(OSError):
+        store.remove('g16')  # Triggers the compaction
+
+    _check(TemplateStore(base).load(), {f"g{i}": i for i in range(16, 40)})
+
+
+def test_torn_append_is_ignored_and_overwritten(tmp_path):
+    base = str(tmp_path / 'custom_gestures')
+    store = TemplateStore(base)
+    store.add('wave', _template(1))
+    with open(base + '.f32', 'ab') as f:
+        f.write(b'\0' * 20)  # Partial record from an interrupted append
+
+    reloaded = TemplateStore(base)
+    _check(reloaded.load(), {'wave': 1})
+    reloaded.add('point', _template(2))
+    _check(TemplateStore(base).load(), {'wave': 1, 'point': 2})
+
+
+def test_rejects_wrong_dimension(tmp_path):
+    store = TemplateStore(str(tmp_path / 'custom_gestures'))
+    with pytest.raises(ValueError):
+        store.add('bad', np.zeros(10))
+    assert store.import_templates({'bad': [0.0] * 10, 'ok': [0.5] * TEMPLATE_DIM}) == 1
+    assert store.names() == ['ok']
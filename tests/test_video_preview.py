@@ -0,0 +1,81 @@
+import pytest
+
+pytest.importorskip('cv2')  # video_preview imports OpenCV for the encoder
+
+from video_preview import PreviewBroadcaster
+
+
+class FakeSocket:
+    """Records sends; acks are delivered by the test, like a browser would"""
+
+    def __init__(self):
+        self.sent = []     # (sid, payload)
+        self.acks = {}     # sid -> callback of the frame in flight
+
+    def send(self, sid, payload, callback):
+        self.sent.append((sid, payload))
+        self.acks[sid] = callback
+
+    def ack(self, sid):
+        self.acks.pop(sid)()
+
+    def frames_for(self, sid):
+        return [payload for to, payload in self.sent if to == sid]
+
+
+def test_nothing_is_sent_without_subscribers():
+    socket = FakeSocket()
+    broadcaster = PreviewBroadcaster(socket.send)
+    assert not broadcaster.has_subscribers()
+    broadcaster.publish('frame 1')
+    assert socket.sent == []
+
+
+def test_fast_client_gets_every_frame():
+    socket = FakeSocket()
+    broadcaster = PreviewBroadcaster(socket.send)
+    broadcaster.subscribe('fast')
+    for i in range(5):
+        broadcaster.publish(f"frame {i}")
+        socket.ack('fast')
+    assert socket.frames_for('fast') == [f"frame {i}" for i in range(5)]
+    assert broadcaster.get_stats()['fast'] == {'sent': 5, 'dropped': 0}
+
+
+def test_slow_client_only_gets_the_latest_frame_after_its_ack():
+    socket = FakeSocket()
+    broadcaster = PreviewBroadcaster(socket.send, ack_timeout=60)
+    broadcaster.subscribe('slow')
+    broadcaster.subscribe('fast')
+    for i in range(5):
+        broadcaster.publish(f"frame {i}")
+        socket.ack('fast')
+
+    # One frame in flight and only the newest one waiting; the rest were dropped
+    assert socket.frames_for('slow') == ['frame 0']
+    assert broadcaster.get_stats()['slow'] == {'sent': 1, 'dropped': 3}
+    socket.ack('slow')
+    assert socket.frames_for('slow') == ['frame 0', 'frame 4']
+    assert len(socket.frames_for('fast')) == 5
+
+
+def test_lost_ack_times_out():
+    socket = FakeSocket()
+    broadcaster = PreviewBroadcaster(socket.send, ack_timeout=0.0)
+    broadcaster.subscribe('client')
+    broadcaster.publish('frame 1')  # Its ack never arrives
+    broadcaster.publish('frame 2')
+    assert socket.frames_for('client') == ['frame 1', 'frame 2']
+    assert broadcaster.get_stats()['client']['dropped'] == 1
+
+
+def test_unsubscribed_client_is_forgotten():
+    socket = FakeSocket()
+    broadcaster = PreviewBroadcaster(socket.send)
+    broadcaster.subscribe('client')
+    broadcaster.publish('frame 1')
+    broadcaster.unsubscribe('client')
+    socket.ack('client')  # Late ack after leaving
+    broadcaster.publish('frame 2')
+    assert socket.frames_for('client') == ['frame 1']
+    assert not broadcaster.has_subscribers()
@@ -0,0 +1,136 @@
+from voice_commands import FUZZY_CACHE_SIZE, VoiceCommandGate, VoiceCommandMatcher
+
+COMMANDS = {
+    'click': {'command': 'click', 'action': 'left_click'},
+    'right_click': {'command': 'right click', 'action': 'right_click'},
+    'open_browser': {'command': 'open browser', 'action': 'open_browser'},
+    'close_browser': {'command': 'close browser', 'action': 'close_browser'},
+    'scroll_up': {'command': 'scroll up', 'action': 'scroll_up'},
+    'unmapped': {'command': 'do nothing', 'action': None},
+}
+
+
+def test_exact_single_word():
+    matcher = VoiceCommandMatcher(COMMANDS)
+    assert matcher.match('click') == 'left_click'
+    assert matcher.match('CLICK') == 'left_click'
+
+
+def test_longest_multi_word_command_wins():
+    matcher = VoiceCommandMatcher(COMMANDS)
+    # "right click" contains "click"; the longer command is preferred
+    assert matcher.match('right click') == 'right_click'
+    assert matcher.match('please right click now') == 'right_click'
+    # Words may come in any order
+    assert matcher.match('browser open') == 'open_browser'
+
+
+def test_no_match():
+    matcher = VoiceCommandMatcher(COMMANDS)
+    assert matcher.match('') is None
+    assert matcher.match('browser') is None  # Only part of a command
+    assert matcher.match('do nothing') is None  # Unmapped command
+
+
+def test_ties_go_to_the_first_command():
+    commands = {
+        'a': {'command': 'next tab', 'action': 'next_tab'},
+        'b': {'command': 'tab next', 'action': 'other'},
+    }
+    assert VoiceCommandMatcher(commands).match('next tab') == 'next_tab'
+
+
+def test_fuzzy_matching():
+    strict = VoiceCommandMatcher(COMMANDS)
+    fuzzy = VoiceCommandMatcher(COMMANDS, fuzzy=True, fuzzy_cutoff=0.8)
+    assert strict.match('opn browser') is None
+    assert fuzzy.match('opn browser') == 'open_browser'
+    assert fuzzy.match('completely unrelated') is None
+
+
+def test_fuzzy_cache_is_bounded():
+    matcher = VoiceCommandMatcher(COMMANDS, fuzzy=True)
+    for i in range(FUZZY_CACHE_SIZE + 100):
+        matcher.match(f"dictated{i}")
+    assert len(matcher._fuzzy_cache) == FUZZY_CACHE_SIZE
+    assert matcher.match('opn browser') == 'open_browser'
+
+
+def test_is_exact():
+    matcher = VoiceCommandMatcher(COMMANDS)
+    assert matcher.is_exact('open browser')
+    assert matcher.is_exact('right click')
+    assert not matcher.is_exact('right')        # Prefix of a longer command
+    assert not matcher.is_exact('do nothing')   # Unmapped
+    assert set(matcher.mapped_phrases) == {'click', 'right click', 'open browser', 'close browser', 'scroll up'}
+
+
+def test_rebuild_after_mapping_change():
+    commands = {key: dict(value) for key, value in COMMANDS.items()}
+    assert VoiceCommandMatcher(commands).match('scroll up') == 'scroll_up'
+
+    commands['scroll_up']['action'] = 'volume_up'
+    commands['unmapped']['action'] = 'minimize_window'
+    rebuilt = VoiceCommandMatcher(commands)
+    assert rebuilt.match('scroll up') == 'volume_up'
+    assert rebuilt.match('do nothing') == 'minimize_window'
+    assert 'do nothing' in rebuilt.mapped_phrases
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def _gate(clock, cooldown=1.0):
+    return VoiceCommandGate(VoiceCommandMatcher(COMMANDS).is_exact, cooldown=cooldown, clock=clock)
+
+
+def _feed(gate, result):
+    """Runs `result` through the gate like voice_loop; True if the command ran"""
+    if not gate.should_run(result):
+        return False
+    gate.ran(result)
+    return True
+
+
+def test_gate_final_confirms_early_commit():
+    clock = _Clock()
+    gate = _gate(clock)
+    assert not _feed(gate, {'text': 'scroll', 'final': False, 'utterance_id': 1})  # Not a command yet
+    assert _feed(gate, {'text': 'scroll up', 'final': False, 'utterance_id': 1})
+    assert not _feed(gate, {'text': 'scroll up', 'final': False, 'utterance_id': 1})
+    clock.now += 5
+    assert not _feed(gate, {'text': 'scroll up', 'final': True, 'utterance_id': 1})
+
+
+def test_gate_cooldown_blocked_partial_runs_on_final():
+    clock = _Clock()
+    gate = _gate(clock)
+    assert _feed(gate, {'text': 'click', 'final': True, 'utterance_id': 1})
+    clock.now += 0.2
+    # Still cooling down: the partial must not count as done
+    assert not _feed(gate, {'text': 'scroll up', 'final': False, 'utterance_id': 2})
+    clock.now += 1.0
+    assert _feed(gate, {'text': 'scroll up', 'final': True, 'utterance_id': 2})
+
+
+def test_gate_correction_bypasses_cooldown():
+    clock = _Clock()
+    gate = _gate(clock)
+    assert _feed(gate, {'text': 'scroll up', 'final': False, 'utterance_id': 1})
+    clock.now += 0.1
+    assert _feed(gate, {'text': 'close browser', 'final': True, 'utterance_id': 1})
+    # Unrelated commands still wait for the cooldown
+    assert not _feed(gate, {'text': 'click', 'final': True, 'utterance_id': 2})
+
+
+def test_gate_early_commit_disabled():
+    gate = _gate(_Clock())
+    gate.early_commit = False
+    assert not _feed(gate, {'text': 'scroll up', 'final': False, 'utterance_id': 1})
+    assert not gate.should_run({'text': 'scroll up', 'final': False, 'utterance_id': 1}, command_mode=False)
+    assert _feed(gate, {'text': 'scroll up', 'final': True, 'utterance_id': 1})
@@ -0,0 +1,183 @@
+"""
+Text-to-Speech Service
+Speaks announcements on a dedicated worker thread so no caller waits for
+pyttsx3. Utterances are queued; `preempt` jumps the queue and `interrupt`
+also cuts off whatever is being spoken and drops the backlog.
+Fixed phrases ("Screenshot taken", ...) are rendered to audio once and kept
+in an LRU cache; speaking them again is just a playback through sounddevice.
+"""
+
+import os
+import tempfile
+import wave
+from collections import OrderedDict, deque
+
+import numpy as np
+import pyttsx3
+import sounddevice as sd
+
+from native_threads import threading as native_threading
+from native_threads import time as native_time
+
+
+class SpeechService:
+    def __init__(self, prerender=(), cache_size=32, max_queued=8):
+        """
+        prerender: phrases to render into the cache as soon as the worker starts.
+        cache_size: rendered phrases kept (least recently spoken are evicted).
+        max_queued: utterances waiting at most; when a new one arrives on a
+        full queue, the one that has been waiting longest is dropped (whether
+        the new one is appended or preempts).
+        """
+        self.cache_size = cache_size
+        self.max_queued = max_queued
+        self._prerender = list(prerender)
+        self._cache = OrderedDict()   # Text -> (int16 samples, sample rate)
+        self._uncacheable = set()     # Phrases the driver could not render to WAV
+
+        self._lock = native_threading.Lock()
+        self._pending = native_threading.Condition(self._lock)
+        self._queue = deque()  # (text, cache, queued_at), in speaking order
+        self._interrupt = native_threading.Event()
+        self.engine = None
+        self.stats = {'spoken': 0, 'cache_hits': 0, 'rendered': 0, 'interrupted': 0, 'dropped': 0}
+        self.start_latency_ms = None  # Queue -> first sound, last utterance
+
+        self.running = True
+        self._worker = native_threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    # --- Public API (any thread, never blocks) ---
+    def say(self, text, cache=False, preempt=False, interrupt=False):
+        """
+        Queues `text` to be spoken.
+        cache: the phrase is fixed; render it once and play it back afterwards.
+        preempt: speak it next, ahead of the queued utterances.
+        interrupt: stop the current utterance and discard the queue first.
+        """
+        if not text:
+            return
+        item = (text, cache, native_time.monotonic())
+        with self._lock:
+            if interrupt:
+                self.stats['dropped'] += len(self._queue)
+                self._queue.clear()
+                self._interrupt.set()
+            if len(self._queue) >= self.max_queued:
+                # Preempted items sit in front, so the longest-waiting one can be anywhere
+                self._queue.remove(min(self._queue, key=lambda queued: queued[2]))
+                self.stats['dropped'] += 1
+            if preempt or interrupt:
+                self._queue.appendleft(item)
+            else:
+                self._queue.append(item)
+            self._pending.notify()
+
+    def stop_speaking(self):
+        """Silences the current utterance and drops everything queued"""
+        with self._lock:
+            self.stats['dropped'] += len(self._queue)
+            self._queue.clear()
+            self._interrupt.set()
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['queued'] = len(self._queue)
+        stats['cached_phrases'] = len(self._cache)
+        stats['start_latency_ms'] = self.start_latency_ms
+        return stats
+
+    def close(self):
+        with self._lock:
+            self.running = False
+            self._interrupt.set()
+            self._pending.notify()
+
+    # --- Worker thread ---
+    def _run(self):
+        try:
+            # pyttsx3 drivers (SAPI5 in particular) must be used from the thread that created them
+            self.engine = pyttsx3.init()
+            self.engine.connect('started-word', self._on_word)
+        except Exception as e:
+            print(f"Text-to-speech unavailable: {e}")
+            return
+
+        for phrase in self._prerender:
+            if not self.running:
+                return
+            self._render(phrase)
+
+        while True:
+            with self._lock:
+                while self.running and not self._queue:
+                    self._pending.wait(timeout=1.0)
+                if not self.running:
+                    break
+                text, cache, queued_at = self._queue.popleft()
+                # An interrupt that arrived before this utterance started is used up
+                self._interrupt.clear()
+            try:
+                self._speak(text, cache, queued_at)
+            except Exception as e:
+                print(f"Error speaking '{text}': {e}")
+
+    def _speak(self, text, cache, queued_at):
+        audio = self._cached(text) if cache else None
+        self.start_latency_ms = round((native_time.monotonic() - queued_at) * 1000, 1)
+        self.stats['spoken'] += 1
+        if audio is not None:
+            self.stats['cache_hits'] += 1
+            samples, sample_rate = audio
+            sd.play(samples, sample_rate)
+            # Sleep for the length of the clip unless interrupted
+            if self._interrupt.wait(timeout=len(samples) / sample_rate + 0.05):
+                sd.stop()
+                self.stats['interrupted'] += 1
+        else:
+            self.engine.say(text)
+            self.engine.runAndWait()
+
+    def _on_word(self, name, location, length):
+        """pyttsx3 callback between words: the only safe point to stop live speech"""
+        if self._interrupt.is_set():
+            self._interrupt.clear()  # Count the utterance once, not once per remaining word
+            self.engine.stop()
+            self.stats['interrupted'] += 1
+
+    def _cached(self, text):
+        """Rendered audio for `text` (rendering it on a miss), or None to speak it live"""
+        audio = self._cache.get(text)
+        if audio is not None:
+            self._cache.move_to_end(text)
+            return audio
+        return self._render(text)
+
+    def _render(self, text):
+        """Synthesizes `text` to a WAV file and loads it into the cache"""
+        if text in self._uncacheable:
+            return None
+        fd, path = tempfile.mkstemp(prefix='tts-', suffix='.wav')
+        os.close(fd)
+        try:
+            self.engine.save_to_file(text, path)
+            self.engine.runAndWait()
+            with wave.open(path, 'rb') as f:
+                if f.getsampwidth() != 2:
+                    raise ValueError(f"{8 * f.getsampwidth()}-bit audio")
+                sample_rate = f.getframerate()
+                samples = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+                samples = samples.reshape(-1, f.getnchannels())
+        except Exception as e:
+            # Some drivers write other formats (or nothing); those phrases are spoken live
+            print(f"Could not pre-render '{text}': {e}")
+            self._uncacheable.add(text)
+            return None
+        finally:
+            os.remove(path)
+
+        self.stats['rendered'] += 1
+        self._cache[text] = (samples, sample_rate)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return samples, sample_rate
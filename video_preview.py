@@ -0,0 +1,129 @@
+"""
+Video Preview Module
+Encodes annotated camera frames for the dashboard preview. The preview has its
+own quality, size and frame-rate settings, independent of the recognition rate.
+"""
+
+import cv2
+
+from native_threads import time as native_time
+
+
+class PreviewEncoder:
+    def __init__(self, quality=70, max_width=480, fps=15):
+        """
+        quality: JPEG quality (1-100)
+        max_width: frames wider than this are downscaled first (0 = never)
+        fps: preview frame-rate cap (0 = no cap)
+        """
+        self.apply_settings({'preview_quality': quality, 'preview_max_width': max_width, 'preview_fps': fps})
+        self._last_encode = 0.0
+        self.frames_encoded = 0
+        self.frames_skipped = 0
+        self.bytes_encoded = 0
+
+    def apply_settings(self, settings):
+        self.quality = int(settings.get('preview_quality', 70))
+        self.max_width = int(settings.get('preview_max_width', 480))
+        fps = float(settings.get('preview_fps', 15))
+        self.min_interval = 1.0 / fps if fps > 0 else 0.0
+
+    def due(self):
+        """True when the frame-rate cap allows another preview frame"""
+        now = native_time.monotonic()
+        if now - self._last_encode < self.min_interval:
+            self.frames_skipped += 1
+            return False
+        self._last_encode = now
+        return True
+
+    def encode(self, frame):
+        """Downscales (if needed) and JPEG-encodes a BGR frame. Returns bytes or None."""
+        h, w = frame.shape[:2]
+        if self.max_width and w > self.max_width:
+            scale = self.max_width / w
+            frame = cv2.resize(frame, (self.max_width, int(h * scale)), interpolation=cv2.INTER_AREA)
+        ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            return None
+        self.frames_encoded += 1
+        self.bytes_encoded += len(buffer)
+        return buffer.tobytes()
+
+    def get_stats(self):
+        return {
+            'frames_encoded': self.frames_encoded,
+            'frames_skipped': self.frames_skipped,
+            'bytes_encoded': self.bytes_encoded
+        }
+
+
+class _PreviewSubscriber:
+    __slots__ = ('pending', 'in_flight_since', 'sent', 'dropped')
+
+    def __init__(self):
+        self.pending = None          # Latest frame not yet sent (older ones are replaced)
+        self.in_flight_since = None  # Set while waiting for the client's ack
+        self.sent = 0
+        self.dropped = 0
+
+
+class PreviewBroadcaster:
+    """
+    Tracks the clients watching the preview and gives each one a
+    latest-frame-only slot. A client gets its next frame only after it has
+    acknowledged the previous one, so a slow browser never makes the server
+    queue up frames for it; frames it could not take are counted as dropped.
+
+    `send(sid, payload, callback)` does the actual emit. Everything here runs
+    on the eventlet hub, so no locking is needed.
+    """
+
+    def __init__(self, send, ack_timeout=2.0):
+        self._send = send
+        self.ack_timeout = ack_timeout
+        self.subscribers = {}
+
+    def subscribe(self, sid):
+        self.subscribers.setdefault(sid, _PreviewSubscriber())
+
+    def unsubscribe(self, sid):
+        self.subscribers.pop(sid, None)
+
+    def has_subscribers(self):
+        return bool(self.subscribers)
+
+    def publish(self, payload):
+        """Offers a new frame to every subscriber"""
+        for sid, subscriber in list(self.subscribers.items()):
+            if subscriber.pending is not None:
+                subscriber.dropped += 1
+            subscriber.pending = payload
+            self._try_send(sid, subscriber)
+
+    def _try_send(self, sid, subscriber):
+        if subscriber.in_flight_since is not None:
+            if native_time.monotonic() - subscriber.in_flight_since < self.ack_timeout:
+                return
+            subscriber.dropped += 1  # Ack never came; assume the frame was lost
+        if subscriber.pending is None:
+            subscriber.in_flight_since = None
+            return
+
+        payload, subscriber.pending = subscriber.pending, None
+        subscriber.in_flight_since = native_time.monotonic()
+        subscriber.sent += 1
+        self._send(sid, payload, lambda *args: self._on_ack(sid))
+
+    def _on_ack(self, sid):
+        subscriber = self.subscribers.get(sid)
+        if subscriber is None:
+            return
+        subscriber.in_flight_since = None
+        self._try_send(sid, subscriber)
+
+    def get_stats(self):
+        return {
+            sid: {'sent': subscriber.sent, 'dropped': subscriber.dropped}
+            for sid, subscriber in self.subscribers.items()
+        }
@@ -0,0 +1,151 @@
+"""
+Voice Command Matcher
+Maps recognized text to the action of the best matching voice command. The
+matcher is compiled once from config['voice_commands'] (pre-tokenized phrases
+plus a word -> commands inverted index), so a lookup only touches the
+commands that share a word with the utterance instead of scanning them all.
+VoiceCommandGate decides which recognizer results actually run a command
+(cooldown, early commit of partial results, confirmation by the final result).
+"""
+
+import difflib
+import time
+from collections import OrderedDict
+
+# Unknown words remembered by the fuzzy matcher. Dictation produces an endless
+# stream of new words, so the cache evicts the least recently used ones.
+FUZZY_CACHE_SIZE = 1024
+
+
+def _tokens(text):
+    return text.lower().split()
+
+
+class VoiceCommandMatcher:
+    """
+    A command matches when all of its words occur in the utterance (in any
+    order); the command with the most words wins, ties go to the one listed
+    first in the config. With `fuzzy` on, utterance words that are not part of
+    any command are replaced by the closest command word (difflib ratio at
+    least `fuzzy_cutoff`) when nothing matches exactly.
+    """
+
+    def __init__(self, voice_commands=None, fuzzy=False, fuzzy_cutoff=0.8):
+        self.fuzzy = fuzzy
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self._actions = []        # Command id -> action (None if unmapped)
+        self._lengths = []        # Command id -> number of words (the ranking)
+        self._unique_words = []   # Command id -> number of distinct words
+        self._index = {}          # Word -> [command ids containing it]
+        self._fuzzy_cache = OrderedDict()  # Unknown word -> closest command word or None (LRU)
+        self.mapped_phrases = []  # Normalized phrases of commands with an action
+        self._exact = set()       # Mapped phrases that no longer mapped phrase starts with
+
+        for cmd_data in (voice_commands or {}).values():
+            words = _tokens(cmd_data.get('command', ''))
+            if not words:
+                continue
+            command_id = len(self._actions)
+            self._actions.append(cmd_data.get('action'))
+            self._lengths.append(len(words))
+            distinct = set(words)
+            self._unique_words.append(len(distinct))
+            for word in distinct:
+                self._index.setdefault(word, []).append(command_id)
+            if cmd_data.get('action'):
+                self.mapped_phrases.append(' '.join(words))
+
+        prefixes = set()
+        for phrase in self.mapped_phrases:
+            words = phrase.split()
+            for end in range(1, len(words)):
+                prefixes.add(' '.join(words[:end]))
+        self._exact = set(self.mapped_phrases) - prefixes
+
+    def _best(self, spoken_words):
+        hits = {}
+        for word in spoken_words:
+            for command_id in self._index.get(word, ()):
+                hits[command_id] = hits.get(command_id, 0) + 1
+        best_id = None
+        for command_id, count in hits.items():
+            if count != self._unique_words[command_id]:
+                continue
+            if (best_id is None or self._lengths[command_id] > self._lengths[best_id]
+                    or (self._lengths[command_id] == self._lengths[best_id] and command_id < best_id)):
+                best_id = command_id
+        return best_id
+
+    def _closest_word(self, word):
+        if word in self._fuzzy_cache:
+            self._fuzzy_cache.move_to_end(word)
+            return self._fuzzy_cache[word]
+        close = difflib.get_close_matches(word, self._index.keys(), n=1, cutoff=self.fuzzy_cutoff)
+        self._fuzzy_cache[word] = close[0] if close else None
+        if len(self._fuzzy_cache) > FUZZY_CACHE_SIZE:
+            self._fuzzy_cache.popitem(last=False)
+        return self._fuzzy_cache[word]
+
+    def match(self, spoken_text):
+        """Returns the action of the best matching command, or None"""
+        spoken_words = set(_tokens(spoken_text))
+        if not spoken_words:
+            return None
+
+        best_id = self._best(spoken_words)
+        if best_id is None and self.fuzzy:
+            corrected = {word if word in self._index else self._closest_word(word) for word in spoken_words}
+            corrected.discard(None)
+            best_id = self._best(corrected)
+        return self._actions[best_id] if best_id is not None else None
+
+    def is_exact(self, spoken_text):
+        """True if the text is exactly one mapped command and no longer command starts with it"""
+        return ' '.join(_tokens(spoken_text)) in self._exact
+
+
+class VoiceCommandGate:
+    """
+    Filters recognizer results down to the ones that should run a command.
+    Final results run when the cooldown allows. With early commit, a partial
+    result that is exactly one command runs right away (see
+    VoiceCommandMatcher.is_exact); the final result of that utterance then
+    only confirms it, unless it differs, in which case the correction runs
+    without waiting for the cooldown the early commit started.
+
+    Call should_run(result) for every result and ran(result) once its command
+    has actually been executed. is_exact: callable(text) -> bool.
+    """
+
+    def __init__(self, is_exact, cooldown=0.5, early_commit=True, clock=time.monotonic):
+        self.is_exact = is_exact
+        self.cooldown = cooldown
+        self.early_commit = early_commit
+        self.clock = clock
+        self._committed = {}  # utterance_id -> text already run from a partial result
+        self._last_run = None
+
+    def _cooled_down(self):
+        return self._last_run is None or self.clock() - self._last_run >= self.cooldown
+
+    def should_run(self, result, command_mode=True):
+        text = result.get('text')
+        if not text:
+            return False
+        utterance_id = result.get('utterance_id')
+        if result.get('final', True):
+            early_text = self._committed.pop(utterance_id, None)
+            if early_text is not None:
+                # Same words as the early commit: already done. Different words: a correction
+                return not text.startswith(early_text)
+            return self._cooled_down()
+        if not (self.early_commit and command_mode and utterance_id not in self._committed
+                and self.is_exact(text)):
+            return False
+        return self._cooled_down()
+
+    def ran(self, result):
+        """Records that the command for `result` was executed"""
+        self._last_run = self.clock()
+        if not result.get('final', True):
+            self._committed = {result.get('utterance_id'): result['text']}
@@ -4,83 +4,330 @@ Captures microphone audio and recognizes speech without internet
 """
 
 import json
-import queue
+from collections import deque
+
+import numpy as np
 import sounddevice as sd
 from vosk import Model, KaldiRecognizer
 
+# Audio arrives on a PortAudio thread and is decoded on a native thread, so
+# the queues and the decoder thread must be real ones, not eventlet's
+from native_threads import queue
+from native_threads import threading as native_threading
+from native_threads import time as native_time
+from model_registry import models
+
+UNKNOWN_WORD = '[unk]'
+
+
+def build_command_grammar(phrases):
+    """
+    Vosk grammar (a JSON list) restricting decoding to the given command
+    phrases. Anything else is decoded as [unk]. Phrases without letters can't
+    be spoken and are left out. Returns None when no phrase is usable.
+    """
+    cleaned = sorted({' '.join(p.lower().split()) for p in phrases if p and any(c.isalpha() for c in p)})
+    if not cleaned:
+        return None
+    return json.dumps(cleaned + [UNKNOWN_WORD])
+
+
+def load_vosk_model(model_path='static/models/vosk-model'):
+    """The Vosk model is read from disk once per process and shared by every recognizer"""
+    return models.get(f"vosk_model({model_path})", lambda: Model(model_path))
+
+
+def _strip_unknown(text):
+    return ' '.join(word for word in text.split() if word != UNKNOWN_WORD)
+
+
 class VoiceRecognizer:
-    def __init__(self, model_path='static/models/vosk-model', sample_rate=16000, config=None):
-        """Initialize Vosk voice recognizer"""
+    def __init__(self, model_path='static/models/vosk-model', sample_rate=16000, config=None, block_size=None,
+                 mode=None, commands=None):
+        """
+        Initialize Vosk voice recognizer.
+        block_size: samples per audio callback (default `voice_block_size` from
+        config, 800 = 50 ms at 16 kHz). Smaller blocks reach Kaldi sooner.
+        mode: 'command' decodes only the `commands` phrases (faster and more
+        accurate), 'free' decodes any speech, e.g. for voice typing
+        (default `voice_mode` from config).
+        """
         
         try:
             print(f"Loading Vosk model from: {model_path}")
-            self.model = Model(model_path)
-            print("Vosk model loaded successfully")
+            self.model = load_vosk_model(model_path)
+            print("Vosk model ready")
         except Exception as e:
             raise Exception(f"Failed to load Vosk model: {e}. "
                           f"Please download from https://alphacephei.com/vosk/models")
         
         self.sample_rate = sample_rate
         self.config = config or {}
-        self.recognizer = KaldiRecognizer(self.model, sample_rate)
+        settings = self.config.get('settings', {})
+        self.mode = mode or settings.get('voice_mode', 'command')
+        self.grammar = build_command_grammar(commands or [])
+        self._reconfigure = False # Set when the mode or grammar changes; applied by the decoder thread
         self.audio_queue = queue.Queue()
+        self.results = queue.Queue() # Final and partial results from the decoder thread
+        self._last_partial = ''
+        
+        self.block_size = int(block_size or settings.get('voice_block_size', 800))
+        
+        # Audio position (samples fed to Kaldi) and the capture time of the
+        # latest fed block, used to turn word times into wall-clock times
+        self.samples_fed = 0
+        self.last_block_time = 0.0
+        self.blocks_processed = 0
+        self.max_backlog = 0
+        self.last_finalize_ms = None
+        self.utterance_id = 0 # Shared by the partial and final results of one utterance
+        self._partial_pending = False
+        self.recognizer = self._make_recognizer()
+        
+        # Voice activity detection: silence never reaches Kaldi
+        self._preroll = deque()
+        self.apply_settings(settings)
+        self._noise_floor = self.vad_threshold / self.vad_noise_ratio
+        self._in_speech = False
+        self._silence_run = 0.0
+        self._last_speech_time = 0.0
+        self.speech_seconds = 0.0
+        self.silence_seconds = 0.0
+        self.speech_segments = 0
+        self.blocks_skipped = 0
         
         self.stream = sd.RawInputStream(
             samplerate=sample_rate,
-            blocksize=8000,
+            blocksize=self.block_size,
             dtype='int16',
             channels=1,
             callback=self._audio_callback
         )
-        self.stream.start()
         self.running = True
+        self._decoder = native_threading.Thread(target=self._decode_loop, daemon=True)
+        self._decoder.start()
+        self.stream.start()
+    
+    def apply_settings(self, settings):
+        """Reads the options that can change while running (VAD tuning)"""
+        self.vad_enabled = bool(settings.get('voice_vad_enabled', True))
+        self.vad_threshold = float(settings.get('voice_vad_threshold', 300)) # Minimum speech RMS (int16)
+        self.vad_noise_ratio = float(settings.get('voice_vad_noise_ratio', 3.0)) # Speech is this far above the noise floor
+        self.vad_padding = float(settings.get('voice_vad_padding', 0.3)) # Seconds kept before speech starts
+        self.vad_hangover = float(settings.get('voice_vad_hangover', 0.4)) # Silence that ends an utterance
+        preroll_blocks = max(1, int(round(self.vad_padding * self.sample_rate / self.block_size)))
+        if preroll_blocks != self._preroll.maxlen:
+            self._preroll = deque(self._preroll, maxlen=preroll_blocks)
     
     def _audio_callback(self, indata, frames, time_info, status):
         """Callback for audio stream"""
         if status:
             print(f"Audio stream status: {status}")
-        self.audio_queue.put(bytes(indata))
+        self.audio_queue.put((bytes(indata), native_time.monotonic()))
+    
+    def _make_recognizer(self):
+        if self.mode == 'command' and self.grammar:
+            recognizer = KaldiRecognizer(self.model, self.sample_rate, self.grammar)
+        else:
+            recognizer = KaldiRecognizer(self.model, self.sample_rate)
+        recognizer.SetWords(True) # Word end times locate the end of the utterance
+        self.samples_fed = 0 # Word times restart with every recognizer
+        self._last_partial = ''
+        self.utterance_id += 1
+        print(f"Voice recognizer in {self.mode} mode" + (" (grammar)" if self.mode == 'command' and self.grammar else ""))
+        return recognizer
+    
+    def set_commands(self, phrases):
+        """Rebuilds the command-mode grammar, e.g. after the voice commands changed"""
+        grammar = build_command_grammar(phrases)
+        if grammar != self.grammar:
+            self.grammar = grammar
+            self._reconfigure = True
+    
+    def set_mode(self, mode):
+        """Switches between 'command' and 'free' decoding at the next audio block"""
+        if mode != self.mode:
+            self.mode = mode
+            self._reconfigure = True
     
-    def recognize(self):
-        """Recognize speech from microphone"""
+    def _utterance_end_time(self, result):
+        """Monotonic time at which the last word of a final result was spoken"""
+        words = result.get('result')
+        if not words:
+            return self.last_block_time
+        # Audio after the last word that was already captured when the block arrived
+        trailing = self.samples_fed / self.sample_rate - words[-1]['end']
+        return self.last_block_time - max(0.0, trailing)
+    
+    def _decode_loop(self):
+        """
+        Decoder thread: waits for audio, feeds every queued block to Kaldi and
+        pushes results to `self.results`. Kaldi's decoding is blocking native
+        code, so it must never run on the eventlet hub.
+        """
+        while self.running:
+            try:
+                block = self.audio_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            try:
+                if self._reconfigure:
+                    # Only this thread touches the recognizer, so it is swapped here
+                    self._reconfigure = False
+                    self.recognizer = self._make_recognizer()
+                    self._in_speech = False
+                self._decode_pending(block)
+            except Exception as e:
+                print(f"Error in voice recognition: {e}")
+        print("Voice decoder stopped.")
+    
+    def _decode_pending(self, block):
+        """Decodes `block` plus everything queued behind it in one pass"""
+        self.max_backlog = max(self.max_backlog, self.audio_queue.qsize() + 1)
+        self._partial_pending = False
+        while block is not None:
+            data, captured_at = block
+            self.blocks_processed += 1
+            if self.vad_enabled:
+                self._gate(data, captured_at)
+            else:
+                self._feed(data, captured_at)
+            
+            try:
+                block = self.audio_queue.get_nowait()
+            except queue.Empty:
+                block = None
+        
+        # One partial for the whole batch, and only when the text changed
+        if self._partial_pending:
+            partial = json.loads(self.recognizer.PartialResult())
+            partial_text = _strip_unknown(partial.get('partial', ''))
+            
+            if partial_text and partial_text != self._last_partial:
+                self._last_partial = partial_text
+                self.results.put({
+                    'text': partial_text,
+                    'confidence': 0.5,
+                    'final': False,
+                    'utterance_end': self.last_block_time, # Speech heard so far ends here
+                    'utterance_id': self.utterance_id
+                })
+    
+    def _feed(self, data, captured_at):
+        """Runs one block through Kaldi and queues the final result at an endpoint"""
+        self.samples_fed += len(data) // 2 # int16 mono
+        self.last_block_time = captured_at
+        
+        if self.recognizer.AcceptWaveform(data):
+            self._partial_pending = False
+            self._push_final(json.loads(self.recognizer.Result()))
+        else:
+            self._partial_pending = True
+    
+    def _push_final(self, result):
+        self._last_partial = ''
+        text = _strip_unknown(result.get('text', ''))
+        
+        if text:
+            utterance_end = self._last_speech_time if self.vad_enabled else self._utterance_end_time(result)
+            self.last_finalize_ms = (native_time.monotonic() - utterance_end) * 1000
+            self.results.put({
+                'text': text,
+                'confidence': 1.0,
+                'final': True,
+                'utterance_end': utterance_end,
+                'utterance_id': self.utterance_id
+            })
+        self.utterance_id += 1
+    
+    # --- Voice activity detection ---
+    def _is_speech(self, data):
+        """Energy VAD: block RMS against a threshold that follows the noise floor"""
+        samples = np.frombuffer(data, dtype=np.int16).astype(np.float32)
+        rms = float(np.sqrt(np.mean(samples * samples))) if len(samples) else 0.0
+        threshold = max(self.vad_threshold, self._noise_floor * self.vad_noise_ratio)
+        if rms > threshold:
+            # Creep up slowly even during "speech", so a constant loud noise
+            # source can't hold the gate open forever
+            self._noise_floor += (rms - self._noise_floor) * 0.002
+            return True
+        self._noise_floor += (rms - self._noise_floor) * 0.05
+        return False
+    
+    def _gate(self, data, captured_at):
+        """
+        Forwards only speech segments to Kaldi: `vad_padding` seconds of audio
+        before the speech starts and up to `vad_hangover` seconds of silence
+        after it. The utterance is then finalized and the recognizer reset, so
+        nothing is decoded between utterances.
+        """
+        duration = len(data) / 2 / self.sample_rate
+        speech = self._is_speech(data)
+        if speech:
+            self.speech_seconds += duration
+            self._last_speech_time = captured_at
+        else:
+            self.silence_seconds += duration
+        
+        if not self._in_speech:
+            if not speech:
+                self._preroll.append((data, captured_at))
+                self.blocks_skipped += 1
+                return
+            self._in_speech = True
+            self._silence_run = 0.0
+            self.speech_segments += 1
+            for padded_data, padded_at in self._preroll:
+                self._feed(padded_data, padded_at)
+            self._preroll.clear()
+        
+        self._feed(data, captured_at)
+        self._silence_run = 0.0 if speech else self._silence_run + duration
+        if self._silence_run >= self.vad_hangover:
+            self._end_utterance()
+    
+    def _end_utterance(self):
+        self._in_speech = False
+        self._partial_pending = False
+        self._push_final(json.loads(self.recognizer.FinalResult()))
+        self.recognizer.Reset()
+    
+    def recognize(self, timeout=0.0):
+        """
+        Returns the next final or partial result from the decoder thread,
+        waiting up to `timeout` seconds for one (None on timeout or stop).
+        A blocking wait must go through run_native when called from the hub.
+        """
         if not self.running:
             return None
-        
         try:
-            if not self.audio_queue.empty():
-                data = self.audio_queue.get_nowait()
-                
-                if self.recognizer.AcceptWaveform(data):
-                    result = json.loads(self.recognizer.Result())
-                    text = result.get('text', '')
-                    
-                    if text:
-                        return {
-                            'text': text,
-                            'confidence': 1.0,
-                            'final': True
-                        }
-                else:
-                    partial = json.loads(self.recognizer.PartialResult())
-                    partial_text = partial.get('partial', '')
-                    
-                    if partial_text:
-                        return {
-                            'text': partial_text,
-                            'confidence': 0.5,
-                            'final': False
-                        }
-        
+            if timeout:
+                return self.results.get(timeout=timeout)
+            return self.results.get_nowait()
         except queue.Empty:
-            pass
-        except Exception as e:
-            print(f"Error in voice recognition: {e}")
-        
-        return None
+            return None
+    
+    def get_stats(self):
+        return {
+            'block_size': self.block_size,
+            'mode': self.mode,
+            'blocks_processed': self.blocks_processed,
+            'queued_blocks': self.audio_queue.qsize(),
+            'queued_results': self.results.qsize(),
+            'max_backlog': self.max_backlog,
+            'last_finalize_ms': self.last_finalize_ms,
+            'vad_enabled': self.vad_enabled,
+            'speech_seconds': round(self.speech_seconds, 1),
+            'silence_seconds': round(self.silence_seconds, 1),
+            'speech_segments': self.speech_segments,
+            'blocks_skipped': self.blocks_skipped
+        }
     
     def stop(self):
-        """Stop the recognizer and release resources"""
+        """Stop the decoder thread and release the microphone (blocks briefly; use run_native from the hub)"""
         self.running = False
         if self.stream:
             self.stream.stop()
-            self.stream.close()
\ No newline at end of file
+            self.stream.close()
+        if self._decoder.is_alive():
+            self._decoder.join(timeout=1.0)
\ No newline at end of file